@@ -1,16 +1,36 @@
 # 표준 라이브러리
+import asyncio
+import base64
+import bisect
+import hashlib
+import hmac
+import ipaddress
+import json
+import math
 import os                                           # 환경변수 읽기용 표준모듈
+import random
+import re
 import secrets
+import socket
 import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextvars import Context, ContextVar
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone  # 토큰 만료 등 시간 계산
+from email.message import EmailMessage
 from time import perf_counter
-from typing import Optional, List                   # 타입힌트
+from typing import Any, Callable, Optional, List, Union  # 타입힌트
 
 # FastAPI 본체와 에러 응답 도우미
-from fastapi import FastAPI, HTTPException, Depends, status, Response, Request, Cookie
+from fastapi import FastAPI, HTTPException, Depends, status, Response, Request, Cookie, Query
 
 # 브라우저(프론트엔드)에서 오는 요청을 허용하기 위한 CORS 미들웨어
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
 
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm  # OAuth2 폼/스킴
 
@@ -22,11 +42,13 @@ from pydantic import BaseModel, Field, EmailStr
 
 # MongoDB의 기본 키 타입(ObjectId)
 from bson import ObjectId
+from bson.errors import InvalidId
 
 from passlib.context import CryptContext              # 비밀번호 해시/검증
 from jose import jwt, JWTError                        # JWT 인코딩/디코딩
 
-from pymongo.errors import DuplicateKeyError
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 
 import uuid
 
@@ -46,6 +68,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 # JWT 토큰을 Authorization: Bearer <token> 에서 꺼내는 의존성
 # Swagger의 Authorize 버튼이 토큰을 가져오는 주소를 지정
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# 공개 API에서 "로그인했다면" 사용자 정보를 쓰고 싶을 때(토큰 없으면 None)
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
 
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
@@ -57,21 +81,28 @@ EPP_TTL_MINUTES = 15
 CODE_TTL_MINUTES = 10
 MAX_CODE_ATTEMPTS = 6
 
-RATE_BUCKET = {}  # naive in-memory rate limiter bucket
-def rate_limit(key: str, limit: int, per_seconds: int) -> bool:
-    now = time.time()
-    timestamps = RATE_BUCKET.setdefault(key, [])
-    RATE_BUCKET[key] = [t for t in timestamps if now - t < per_seconds]
-    if len(RATE_BUCKET[key]) >= limit:
-        return False
-    RATE_BUCKET[key].append(now)
-    return True
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")         # memory | mongo
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))   # memory 백엔드 키 상한(LRU)
+
+AUTH_FLOOR_MS = 280  # 인증 응답 최소 지연(ms). 성공/실패 응답 시간을 맞춰 계정 존재 여부 유출 방지
 
-def delay_floor(start_ts: float, target_ms: int = 280) -> None:
+async def delay_floor(start_ts: float, target_ms: int = AUTH_FLOOR_MS) -> None:
     elapsed = (perf_counter() - start_ts) * 1000
     sleep_ms = max(0.0, target_ms - elapsed)
     if sleep_ms:
-        time.sleep(sleep_ms / 1000)
+        await asyncio.sleep(sleep_ms / 1000)  # 루프를 막지 않고 대기
+
+@asynccontextmanager
+async def timing_floor(target_ms: int = AUTH_FLOOR_MS):
+    """
+    async with timing_floor(): ...
+    블록이 정상 종료하든 HTTPException 등으로 빠져나가든 최소 target_ms 를 채운 뒤 반환.
+    """
+    t0 = perf_counter()
+    try:
+        yield
+    finally:
+        await delay_floor(t0, target_ms)
 
 def normalize_email(email: str) -> str:
     return email.strip().lower()
@@ -79,6 +110,16 @@ def normalize_email(email: str) -> str:
 def gen_code() -> str:
     return f"{secrets.randbelow(1_000_000):06d}"
 
+# 6자리 코드/메일 인증 토큰은 bcrypt 대신 서버 키 HMAC-SHA256 다이제스트로 저장한다.
+# (코드는 시도 횟수 제한, 토큰은 고엔트로피라 느린 해시가 필요 없음 → 인덱스 조회 1회로 검증)
+SECRET_HMAC_KEY = os.getenv("SECRET_HMAC_KEY", SECRET_KEY).encode()
+# 마이그레이션 기간: 기존 bcrypt(code_hash/token_hash) 레코드도 검증 허용
+LEGACY_BCRYPT_SECRETS = os.getenv("LEGACY_BCRYPT_SECRETS", "1") == "1"
+
+def secret_digest(purpose: str, email: str, secret: str) -> str:
+    msg = f"{purpose}:{email}:{secret}".encode()
+    return hmac.new(SECRET_HMAC_KEY, msg, hashlib.sha256).hexdigest()
+
 def create_epp(email: str) -> str:
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=EPP_TTL_MINUTES)
@@ -109,9 +150,12 @@ def verify_with_dummy(plain: str, hashed: Optional[str]) -> bool:
         return False
     return pwd_context.verify(plain, hashed)
 
-async def send_email_code(email: str, code: str) -> None:
-    # TODO: integrate with real mail provider; dev uses stdout only.
-    print(f"[MAIL] to={email} code={code}")
+async def queue_email_code(email: str, code: str) -> None:
+    # 실제 발송은 mailer 디스패처가 (요청 경로에서는 outbox 저장 1회)
+    await mailer.enqueue(
+        email, "인증 코드", f"인증코드: {code}\n{CODE_TTL_MINUTES}분 안에 입력해 주세요.",
+        timedelta(minutes=CODE_TTL_MINUTES),
+    )
 
 # FastAPI 애플리케이션 인스턴스 생성
 app = FastAPI()
@@ -124,19 +168,594 @@ app.add_middleware(
     allow_methods=["*"],   # GET/POST/PUT/DELETE 등 전부 허용
     allow_headers=["*"],   # 모든 헤더 허용(예: Content-Type)
     allow_credentials=True,
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count", "ETag"],  # 페이지네이션 헤더를 프론트에서 읽을 수 있게
 )
 
 
+# -----------------------------
+# 응답 압축 (zstd / br / gzip)
+# -----------------------------
+# Accept-Encoding 으로 협상해 COMPRESS_MIN_SIZE 이상인 텍스트 응답만 압축한다.
+# - 한 번에 오는 본문: 통째로 압축 후 Content-Length 갱신
+# - StreamingResponse(NDJSON 등): 청크마다 증분 압축(Content-Length 제거)
+# - SSE 는 이벤트가 바로 가야 하므로 압축하지 않음
+# - 스트리밍은 청크마다 flush 해서 NDJSON 배치가 압축기 버퍼에 머물지 않게 함
+# - 압축 컨텍스트 재사용은 zstd 만(ZstdCompressor 풀). zlib/brotli 객체는 초기화(reset) API 가 없고
+#   미리 만든 원본을 copy() 해도 새로 만드는 것과 비용이 같아서(bench_compression) 응답마다 새로 만든다
+# - 압축된 표현은 바이트가 다르므로 ETag 는 약한(W/) ETag 로 바꿈(If-None-Match 비교는 W/ 무시)
+try:
+    import brotli
+except ImportError:  # 없으면 해당 인코딩만 빠짐
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_ENABLED = os.getenv("COMPRESS", "1") == "1"
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))                    # bytes
+COMPRESS_ENCODINGS = os.getenv("COMPRESS_ENCODINGS", "zstd,br,gzip").split(",")   # 서버 선호 순서
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))      # 동적 응답용(11 은 너무 느림)
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+class GzipCodec:
+    name = "gzip"
+
+    def compress(self, data: bytes) -> bytes:
+        c = self.begin()
+        return c.compress(data) + c.flush()
+
+    def begin(self):
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)      # 31 = gzip 헤더
+
+    def chunk(self, state, data: bytes, flush: bool) -> bytes:
+        out = state.compress(data)
+        return out + state.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def end(self, state) -> bytes:
+        return state.flush()
+
+    def release(self, state) -> None:
+        pass
+
+class BrotliCodec:
+    name = "br"
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    def begin(self):
+        return brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, state, data: bytes, flush: bool) -> bytes:
+        out = state.process(data)
+        return out + state.flush() if flush else out
+
+    def end(self, state) -> bytes:
+        return state.finish()
+
+    def release(self, state) -> None:
+        pass
+
+class ZstdCodec:
+    """ZstdCompressor 는 스트림 하나에만 쓸 수 있어 풀로 돌려 씀(단일 이벤트 루프라 락 없음)."""
+    name = "zstd"
+
+    def __init__(self, pool_size: int = 32):
+        self._oneshot = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        self._free: list = []
+        self._pool_size = pool_size
+
+    def compress(self, data: bytes) -> bytes:
+        return self._oneshot.compress(data)
+
+    def begin(self):
+        cctx = self._free.pop() if self._free else zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return cctx, cctx.compressobj()
+
+    def chunk(self, state, data: bytes, flush: bool) -> bytes:
+        out = state[1].compress(data)
+        return out + state[1].flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+
+    def end(self, state) -> bytes:
+        return state[1].flush()
+
+    def release(self, state) -> None:
+        if len(self._free) < self._pool_size:
+            self._free.append(state[0])     # 다음 compressobj() 가 새 프레임으로 리셋
+
+def build_codecs() -> list:
+    available = {"gzip": GzipCodec}
+    if brotli is not None:
+        available["br"] = BrotliCodec
+    if zstandard is not None:
+        available["zstd"] = ZstdCodec
+    return [available[n]() for n in (e.strip() for e in COMPRESS_ENCODINGS) if n in available]
+
+def pick_codec(codecs: list, accept: str):
+    """Accept-Encoding 에서 q>0 인 것 중 서버 선호 순으로 첫 번째."""
+    accepted = {}
+    for part in accept.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for codec in codecs:
+        if accepted.get(codec.name, accepted.get("*", 0.0)) > 0:
+            return codec
+    return None
+
+class CompressionMiddleware:
+    """순수 ASGI 미들웨어(스트리밍 응답을 버퍼링하지 않음)."""
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = build_codecs()
+
+    @staticmethod
+    def compressible(headers: Headers) -> bool:
+        ctype = headers.get("content-type", "")
+        return ctype.startswith(COMPRESSIBLE_TYPES) and not ctype.startswith("text/event-stream")
+
+    @staticmethod
+    def weaken_etag(headers: MutableHeaders) -> None:
+        """
+        인코딩을 협상한 응답의 ETag 는 크기(임계값)와 무관하게 항상 약한 태그로 보낸다.
+        그래야 같은 클라이언트가 받는 200 과 304 의 검증자 형태가 언제나 같다.
+        """
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    def encoded_start(self, start: dict, encoding: Optional[str], length: Optional[int]) -> dict:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers.add_vary_header("Accept-Encoding")
+        self.weaken_etag(headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        elif "content-length" in headers:
+            del headers["Content-Length"]
+        return {**start, "headers": headers.raw}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        codec = pick_codec(self.codecs, Headers(scope=scope).get("accept-encoding", ""))
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        mode = "pending"    # pending → passthrough | stream
+        start = None
+        state = None
+
+        async def send_wrapper(message):
+            nonlocal mode, start, state
+            if mode == "passthrough":
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                status_code = message["status"]
+                if status_code == 304:
+                    mode = "passthrough"    # 본문 없음. 200 이 보냈을 약한 태그 그대로
+                    out = MutableHeaders(raw=list(message["headers"]))
+                    out.add_vary_header("Accept-Encoding")
+                    self.weaken_etag(out)
+                    await send({**message, "headers": out.raw})
+                    return
+                if (status_code < 200 or status_code == 204
+                        or "content-encoding" in headers or not self.compressible(headers)):
+                    mode = "passthrough"
+                    await send(message)
+                    return
+                start = message         # 본문 크기를 볼 때까지 보류
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if mode == "pending":
+                if not more:
+                    mode = "passthrough"
+                    if len(body) < self.minimum_size:
+                        await send(self.encoded_start(start, None, len(body)))
+                        await send(message)
+                        return
+                    body = codec.compress(body)
+                    await send(self.encoded_start(start, codec.name, len(body)))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                mode = "stream"
+                state = codec.begin()
+                await send(self.encoded_start(start, codec.name, None))
+            out = codec.chunk(state, body, more) if body else b""
+            if not more:
+                out += codec.end(state)
+                codec.release(state)
+                state = None
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+if COMPRESS_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+
+# -----------------------------
+# 메트릭 (GET /metrics, Prometheus 텍스트 형식)
+# -----------------------------
+# - 라우트(경로 템플릿)별 요청 수/지연 히스토그램, 처리 중 요청 수, 이벤트 루프 지연
+# - Mongo 명령 수/시간(라우트별): pymongo CommandListener → 요청마다 모아 두었다가 끝날 때 라우트에 합산
+# - bcrypt 소요 시간, 레이트리밋 거절 수
+# 요청당 비용은 perf_counter 2번 + dict 갱신 정도(bench_metrics_overhead). 락 없음:
+# Motor 실행 스레드의 Mongo 리스너는 list/deque 에 append 만 하고(GIL 하에서 원자적), 합산은 이벤트 루프에서.
+# /metrics 는 METRICS_TOKEN 이 있으면 Bearer 토큰, 없으면 루프백/사설망 주소에서만 응답(그 외 404).
+# 멀티 워커: 워커마다 METRICS_FLUSH_SECONDS 주기로 스냅샷을 metrics_snapshots 에 저장하고,
+# /metrics 는 어느 워커가 받든 전체 워커 값을 worker 라벨로 구분해 내보낸다(다른 워커 값은 최대 한 주기 늦음).
+METRICS_ENABLED = os.getenv("METRICS", "1") == "1"
+METRICS_SHARE = os.getenv("METRICS_SHARE", "1") == "1"                   # 멀티 워커 스냅샷 공유
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_STALE_SECONDS = 60                                               # 이보다 오래된 스냅샷(죽은 워커)은 무시
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (이름, 타입, 설명). 출력 순서도 이 순서
+METRIC_FAMILIES = {
+    "http_requests_total": ("counter", "HTTP requests by route template and status."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route template (SSE streams excluded)."),
+    "http_requests_in_flight": ("gauge", "HTTP requests currently being served (SSE streams excluded)."),
+    "sse_subscribers": ("gauge", "Open server-sent event streams."),
+    "eventloop_lag_seconds": ("histogram", "Extra delay of a periodic asyncio sleep."),
+    "mongo_commands_total": ("counter", "MongoDB commands by route and command name."),
+    "mongo_command_seconds_total": ("counter", "Total MongoDB command time by route and command name."),
+    "mongo_command_failures_total": ("counter", "Failed MongoDB commands by route and command name."),
+    "bcrypt_duration_seconds": ("histogram", "bcrypt hash/verify time including pool queueing."),
+    "bcrypt_pending": ("gauge", "bcrypt jobs queued or running."),
+    "rate_limit_rejections_total": ("counter", "Requests rejected by the rate limiter, by key prefix."),
+    "cache_hits_total": ("counter", "In-process cache hits, by cache."),
+    "cache_misses_total": ("counter", "In-process cache misses, by cache."),
+    "cache_entries": ("gauge", "Entries currently held, by cache."),
+    "post_cache_queries_total": ("counter", "MongoDB lookups issued by the post cache on a miss."),
+    "post_cache_coalesced_total": ("counter", "Post cache misses that joined an in-flight lookup instead of querying."),
+}
+
+def observe(store: dict, key: tuple, value: float) -> None:
+    """store[key] = [버킷별 개수..., +Inf, 합계, 개수] (누적은 내보낼 때 계산)"""
+    h = store.get(key)
+    if h is None:
+        h = store[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0, 0]
+    h[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+    h[-2] += value
+    h[-1] += 1
+
+def histogram_samples(family: str, store: dict, label_names: tuple) -> list:
+    out = []
+    for key, h in store.items():
+        labels = dict(zip(label_names, key))
+        acc = 0
+        for i, le in enumerate(LATENCY_BUCKETS + ("+Inf",)):
+            acc += h[i]
+            out.append([family, family + "_bucket", {**labels, "le": str(le)}, acc])
+        out.append([family, family + "_sum", labels, h[-2]])
+        out.append([family, family + "_count", labels, h[-1]])
+    return out
+
+class Metrics:
+    def __init__(self):
+        self.requests: dict = {}        # (method, route, status) -> 개수
+        self.latency: dict = {}         # (method, route) -> 히스토그램
+        self.in_flight = 0
+        self.loop_lag: dict = {}        # () -> 히스토그램
+        self.mongo: dict = {}           # (route, command) -> [개수, 마이크로초 합, 실패]
+        self.bcrypt: dict = {}          # (op,) -> 히스토그램
+        self.rate_limited: dict = {}    # 키 접두어 -> 개수
+        self.background_mongo = deque()  # 요청 밖 Mongo 명령 (command, 마이크로초, 실패) — 리스너 스레드가 append
+
+    def add_mongo(self, route: str, calls) -> None:
+        """(command, 마이크로초, 실패) 목록을 라우트에 합산. 이벤트 루프에서만 호출."""
+        mongo = self.mongo
+        for command, micros, failed in calls:
+            row = mongo.get((route, command))
+            if row is None:
+                row = mongo[(route, command)] = [0, 0, 0]
+            row[0] += 1
+            row[1] += micros
+            row[2] += failed
+
+    def drain_background_mongo(self) -> None:
+        q = self.background_mongo
+        self.add_mongo("background", (q.popleft() for _ in range(len(q))))
+
+    def samples(self) -> list:
+        """[family, 샘플 이름, 라벨, 값] 목록(스냅샷 저장/출력 공용)"""
+        out = [
+            ["http_requests_total", "http_requests_total", {"method": m, "route": r, "status": str(st)}, n]
+            for (m, r, st), n in self.requests.items()
+        ]
+        out += histogram_samples("http_request_duration_seconds", self.latency, ("method", "route"))
+        out.append(["http_requests_in_flight", "http_requests_in_flight", {}, self.in_flight])
+        out.append(["sse_subscribers", "sse_subscribers", {}, event_hub.count])
+        out += histogram_samples("eventloop_lag_seconds", self.loop_lag, ())
+        self.drain_background_mongo()
+        for (route, command), (n, micros, failed) in self.mongo.items():
+            labels = {"route": route, "command": command}
+            out.append(["mongo_commands_total", "mongo_commands_total", labels, n])
+            out.append(["mongo_command_seconds_total", "mongo_command_seconds_total", labels, micros / 1e6])
+            if failed:
+                out.append(["mongo_command_failures_total", "mongo_command_failures_total", labels, failed])
+        out += histogram_samples("bcrypt_duration_seconds", self.bcrypt, ("op",))
+        out.append(["bcrypt_pending", "bcrypt_pending", {}, hasher.pending])
+        out += [
+            ["rate_limit_rejections_total", "rate_limit_rejections_total", {"scope": k}, n]
+            for k, n in self.rate_limited.items()
+        ]
+        for name, cache in (("post", post_cache.cache), ("principal", principal_cache), ("token", token_cache)):
+            st = cache.stats()
+            out.append(["cache_hits_total", "cache_hits_total", {"cache": name}, st["hits"]])
+            out.append(["cache_misses_total", "cache_misses_total", {"cache": name}, st["misses"]])
+            out.append(["cache_entries", "cache_entries", {"cache": name}, st["size"]])
+        out.append(["post_cache_queries_total", "post_cache_queries_total", {}, post_cache.queries])
+        out.append(["post_cache_coalesced_total", "post_cache_coalesced_total", {}, post_cache.coalesced])
+        return out
+
+metrics = Metrics()
+
+# 지금 요청에서 실행된 Mongo 명령 목록[(command, 마이크로초, 실패)]. 요청 밖(백그라운드)이면 None
+mongo_calls: ContextVar[Optional[list]] = ContextVar("mongo_calls", default=None)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Motor 실행 스레드에서 호출됨(contextvars 는 Motor 가 복사해 넘겨 줌).
+    한 요청의 명령이 여러 스레드에서 동시에 끝날 수 있지만 append 하나뿐이라 락이 필요 없다.
+    """
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        calls = mongo_calls.get()
+        (metrics.background_mongo if calls is None else calls).append((event.command_name, event.duration_micros, 0))
+
+    def failed(self, event) -> None:
+        calls = mongo_calls.get()
+        (metrics.background_mongo if calls is None else calls).append((event.command_name, event.duration_micros, 1))
+
+class MetricsMiddleware:
+    """
+    요청마다: perf_counter 2번, ContextVar set/reset, dict 두 번 갱신. 헤더 객체를 만들지 않고
+    histogram 갱신도 인라인(함수 호출 한 번도 아쉬운 경로). 수치는 benchmarks/bench_metrics_overhead.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        calls: list = []
+        token = mongo_calls.set(calls)
+        status_code = 500
+        long_lived = False      # SSE: 연결 시간이 곧 지연이 되므로 처리 중/지연 히스토그램에서 제외
+
+        async def send_wrapper(message):
+            nonlocal status_code, long_lived
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message["headers"]:      # ASGI 헤더 이름은 소문자
+                    if name == b"content-type":
+                        if value.startswith(b"text/event-stream"):
+                            long_lived = True
+                            metrics.in_flight -= 1
+                        break
+            await send(message)
+
+        m = metrics
+        m.in_flight += 1
+        t0 = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - t0
+            mongo_calls.reset(token)
+            route = scope.get("route")
+            # 매칭 안 된 경로(404)는 원래 경로 대신 한 라벨로 묶어 라벨 폭증 방지
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            key = (method, path, status_code)
+            requests = m.requests
+            requests[key] = requests.get(key, 0) + 1
+            if not long_lived:
+                m.in_flight -= 1
+                h = m.latency.get((method, path))
+                if h is None:
+                    h = m.latency[(method, path)] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0, 0]
+                h[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1      # observe() 와 같은 형식
+                h[-2] += elapsed
+                h[-1] += 1
+            if calls:
+                m.add_mongo(path, calls)
+
+async def watch_loop_lag() -> None:
+    while True:
+        t0 = perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+        observe(metrics.loop_lag, (), max(0.0, perf_counter() - t0 - LOOP_LAG_INTERVAL_SECONDS))
+
+async def flush_metrics() -> None:
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            await metrics_snapshots.replace_one(
+                {"_id": WORKER_ID},
+                {"samples": metrics.samples(), "updated_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"[METRICS] flush failed: {e!r}")
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_metrics(snapshots: list) -> str:
+    """[(worker, samples)] → Prometheus 텍스트. 같은 family 는 워커를 모아 한 블록으로."""
+    rows: dict = {}
+    for worker, samples in snapshots:
+        for family, name, labels, value in samples:
+            rows.setdefault(family, []).append((name, {**labels, "worker": worker}, value))
+    lines = []
+    for family, (kind, help_text) in METRIC_FAMILIES.items():
+        if family not in rows:
+            continue
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for name, labels, value in rows[family]:
+            label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)   # 가장 바깥(압축/CORS 포함 전체 시간)
+
+
 # -----------------------------
 # MongoDB 연결/컬렉션
 # -----------------------------
-client = AsyncIOMotorClient(MONGO_URL)       # 클라이언트 생성(비동기)
+client = AsyncIOMotorClient(                 # 클라이언트 생성(비동기)
+    MONGO_URL, event_listeners=[MongoCommandMetrics()] if METRICS_ENABLED else [],
+)
 db = client[MONGO_DB]                        # DB 선택
 posts = db["posts"]                          # 게시글 컬렉션
 users = db["users"]                          # 사용자 컬렉션
 comments = db["comments"]                    # 콜렉션 핸들
 verifs = db["email_verifications"]
 veri_tokens = db["email_verify_tokens"]  # [ADD]
+post_likes = db["post_likes"]            # 좋아요 (post_id, user_id) 1건 = 1문서
+rate_limits = db["rate_limits"]          # mongo 레이트리밋 백엔드용 시간 버킷
+purge_jobs = db["purge_jobs"]            # 삭제된 글의 댓글/좋아요 정리 작업(진행 상황)
+counters = db["counters"]                # 유지형 카운터 (예: {_id: "posts", n: 전체 글 수})
+metrics_snapshots = db["metrics_snapshots"]  # 워커별 메트릭 스냅샷(/metrics 멀티 워커 합치기)
+mail_outbox = db["mail_outbox"]          # 보낼 메일 큐(디스패처가 발송/재시도)
+event_log = db["post_events"]            # 실시간 이벤트(SSE_SOURCE=changestream 일 때 워커 간 전달)
+
+# 멀티 도큐먼트 트랜잭션은 레플리카셋에서만 동작 → 켜져 있을 때만 사용
+MONGO_TRANSACTIONS = os.getenv("MONGO_TRANSACTIONS", "0") == "1"
+
+@asynccontextmanager
+async def mongo_transaction():
+    """async with mongo_transaction() as session: ... (비활성화 시 session=None)"""
+    if not MONGO_TRANSACTIONS:
+        yield None
+        return
+    async with await client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
+# -----------------------------
+# 레이트리밋 (슬라이딩 윈도 카운터)
+# -----------------------------
+# 키마다 (현재 윈도 카운트, 직전 윈도 카운트)만 들고
+#   추정치 = 직전 * (윈도에서 남은 비율) + 현재
+# 로 근사한다. 호출당 O(1), 키당 메모리도 상수.
+class RateLimiter(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, per_seconds: int) -> bool:
+        """허용이면 True(카운트 증가), 한도 초과면 False."""
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    프로세스 내부 백엔드. 워커 1개/개발용.
+    - OrderedDict 로 LRU 유지, max_keys 를 넘으면 가장 오래된 키부터 버림
+    - 두 윈도가 지나 의미 없어진 키는 호출 때마다 앞쪽부터 조금씩 정리(TTL)
+    """
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [window, prev, cur, expires_at]
+
+    def _evict(self, now: float) -> None:
+        for _ in range(2):                   # 호출당 상수 개만 확인
+            if not self._buckets:
+                return
+            oldest = next(iter(self._buckets.values()))
+            if oldest[3] > now:
+                return
+            self._buckets.popitem(last=False)
+
+    async def hit(self, key: str, limit: int, per_seconds: int) -> bool:
+        now = time.time()
+        window = int(now // per_seconds)
+        self._evict(now)
+        b = self._buckets.get(key)
+        if b is None:
+            b = [window, 0, 0, 0.0]
+            self._buckets[key] = b
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            if b[0] != window:
+                b[1] = b[2] if b[0] == window - 1 else 0
+                b[0], b[2] = window, 0
+        b[3] = (window + 2) * per_seconds    # 이 시각 이후엔 카운트가 모두 0 → 버려도 됨
+        weight = 1 - (now % per_seconds) / per_seconds
+        if b[1] * weight + b[2] >= limit:
+            return False
+        b[2] += 1
+        return True
+
+class MongoRateLimiter(RateLimiter):
+    """
+    여러 워커/노드가 한도를 공유하는 백엔드.
+    - 윈도별 문서에 $inc (upsert) 로 원자적 증가, 직전 윈도 문서는 동시에 조회
+    - expires_at TTL 인덱스로 지난 버킷 자동 삭제
+    - 거절된 요청도 카운트에 포함된다(증가 후 판정)
+    """
+    def __init__(self, coll):
+        self.coll = coll
+
+    async def hit(self, key: str, limit: int, per_seconds: int) -> bool:
+        now = time.time()
+        window = int(now // per_seconds)
+        expires_at = datetime.fromtimestamp((window + 2) * per_seconds, timezone.utc)
+        cur, prev = await asyncio.gather(
+            self.coll.find_one_and_update(
+                {"_id": f"{key}:{per_seconds}:{window}"},
+                {"$inc": {"n": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            ),
+            self.coll.find_one({"_id": f"{key}:{per_seconds}:{window - 1}"}, {"n": 1}),
+        )
+        weight = 1 - (now % per_seconds) / per_seconds
+        before = (prev["n"] if prev else 0) * weight + cur["n"] - 1   # 이번 요청 이전 추정치
+        return before < limit
+
+if RATE_LIMIT_BACKEND == "mongo":
+    rate_limiter: RateLimiter = MongoRateLimiter(rate_limits)
+else:
+    rate_limiter = MemoryRateLimiter(RATE_LIMIT_MAX_KEYS)
+
+async def rate_limit(key: str, limit: int, per_seconds: int) -> bool:
+    allowed = await rate_limiter.hit(key, limit, per_seconds)
+    if not allowed:
+        scope = key.split(":", 1)[0]     # "start:ip:email" → start
+        metrics.rate_limited[scope] = metrics.rate_limited.get(scope, 0) + 1
+    return allowed
 
 # =========================
 # 유틸 (비밀번호/JWT)
@@ -147,6 +766,59 @@ def hash_password(plain: str) -> str:        # 평문 비밀번호 → 해시
 def verify_password(plain: str, hashed: str) -> bool:  # 평문과 해시 비교
     return pwd_context.verify(plain, hashed)
 
+# bcrypt는 호출당 100~300ms CPU를 쓰므로 이벤트 루프 밖(워커 풀)에서 실행한다.
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")            # thread | process
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "4"))      # 동시에 도는 bcrypt 수
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))       # 실행+대기 작업 상한(넘으면 503)
+
+class HashService:
+    """
+    bcrypt 해시/검증을 워커 풀에 넘기는 비동기 래퍼.
+    - 대기열이 가득 차면 즉시 503을 돌려 로그인 폭주가 서버 전체를 막지 않게 함
+    - thread: bcrypt가 GIL을 놓으므로 대부분 충분 / process: CPU 코어를 더 쓰고 싶을 때
+    """
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 64):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+        self.pending += 1
+        t0 = perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.pending -= 1
+            observe(metrics.bcrypt, (fn.__name__,), perf_counter() - t0)
+
+    async def hash(self, plain: str) -> str:
+        return await self._run(hash_password, plain)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self._run(verify_password, plain, hashed)
+
+    async def verify_with_dummy(self, plain: str, hashed: Optional[str]) -> bool:
+        return await self._run(verify_with_dummy, plain, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hasher = HashService(HASH_POOL_KIND, HASH_POOL_WORKERS, HASH_MAX_PENDING)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()                                  # 페이로드 복사
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -181,6 +853,20 @@ class PostOut(PostIn):
     author_username: Optional[str] = None
     comments_count: int = 0
     likes_count: int = 0
+    liked: Optional[bool] = None   # include=liked 요청 시에만 채움
+
+class PostSummary(BaseModel):
+    """
+    목록(fields=summary)용 가벼운 글 형식. 본문 대신 작성 시 저장한 excerpt 만 보냄.
+    """
+    id: str
+    title: str
+    excerpt: str = ""
+    author_id: str
+    author_username: Optional[str] = None
+    comments_count: int = 0
+    likes_count: int = 0
+    liked: Optional[bool] = None
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -192,6 +878,9 @@ class UserOut(BaseModel):
     email: EmailStr
     username: str
 
+class UserUpdate(BaseModel):
+    username: str = Field(min_length=1, max_length=30)
+
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -208,37 +897,236 @@ class CommentOut(BaseModel):
     body: str
     created_at: datetime
 
-def comment_to_out(doc) -> CommentOut:
-    return CommentOut(
-        id=str(doc["_id"]),
-        post_id=str(doc["post_id"]),
-        author_id=str(doc["author_id"]),
-        author_username=doc["author_username"],
-        body=doc["body"],
-        created_at=doc["created_at"],
-    )
+class PostDetailOut(BaseModel):
+    """
+    글 상세 화면 한 번에 그리기용: 글 + 첫 댓글 페이지 + 내 좋아요 여부 + 로그인 사용자.
+    """
+    post: PostOut
+    comments: List[CommentOut]
+    next_cursor: Optional[str] = None   # GET /posts/{pid}/comments?after= 로 이어서 조회
+    liked: bool = False
+    viewer: Optional[UserOut] = None
 
 # -----------------------------
 # DB 문서 → 응답 변환 도우미
 # -----------------------------
+# *_to_dict: 응답 필드 구성의 단일 정의. *_to_out 은 이걸로 모델을 만들고,
+# FAST_JSON 경로는 모델 없이 dict 를 바로 직렬화한다. (liked 는 호출하는 쪽에서 채움)
+def comment_to_dict(doc) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "post_id": str(doc["post_id"]),
+        "author_id": str(doc["author_id"]),
+        "author_username": doc["author_username"],
+        "body": doc["body"],
+        "created_at": doc["created_at"],
+    }
+
+def comment_to_out(doc) -> CommentOut:
+    return CommentOut(**comment_to_dict(doc))
+
+def post_to_dict(doc) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "body": doc["body"],
+        "author_id": str(doc.get("author_id", "")),
+        "author_username": doc.get("author_username"),
+        "comments_count": int(doc.get("comments_count", 0)),
+        "likes_count": int(doc.get("likes_count", len(doc.get("likes", [])))),
+    }
+
 def post_to_out(doc) -> PostOut:                 # Mongo 문서 → PostOut
-    return PostOut(
-        id=str(doc["_id"]),
-        title=doc["title"],
-        body=doc["body"],
-        author_id=str(doc.get("author_id", "")),
-        author_username=doc.get("author_username"),
-        comments_count=int(doc.get("comments_count", 0)),
-        likes_count=int(doc.get("likes_count", len(doc.get("likes", [])))),
-    )
+    return PostOut(**post_to_dict(doc))
+
+def post_to_summary_dict(doc) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "excerpt": doc.get("excerpt") or "",
+        "author_id": str(doc.get("author_id", "")),
+        "author_username": doc.get("author_username"),
+        "comments_count": int(doc.get("comments_count", 0)),
+        "likes_count": int(doc.get("likes_count", 0)),
+    }
+
+def post_to_summary(doc) -> PostSummary:         # Mongo 문서(요약 프로젝션) → PostSummary
+    return PostSummary(**post_to_summary_dict(doc))
+
+# 목록 요약용 본문 발췌 길이. 작성/수정 시 excerpt 필드로 저장해 둔다.
+EXCERPT_LEN = int(os.getenv("POST_EXCERPT_LEN", "200"))
+
+def make_excerpt(body: str) -> str:
+    return body[:EXCERPT_LEN]
+
+# 요약 목록 프로젝션: body/likes 는 서버에서 잘라냄.
+# excerpt 가 없는 옛 글은 body 앞부분을 잘라 보냄(전송량은 동일하게 제한됨)
+POST_SUMMARY_PROJECTION = {
+    "title": 1,
+    "author_id": 1,
+    "author_username": 1,
+    "comments_count": 1,
+    "likes_count": 1,
+    "ver": 1,
+    "excerpt": {"$ifNull": ["$excerpt", {"$substrCP": ["$body", 0, EXCERPT_LEN]}]},
+}
+
+# 응답에 쓰지 않는 큰 필드(레거시 likes 배열, 검색용 n-gram)는 읽지 않는다
+POST_HEAVY_FIELDS = {"likes": 0, "title_grams": 0, "search_grams": 0}
+
+def user_to_dict(doc) -> dict:
+    return {"id": str(doc["_id"]), "email": doc["email"], "username": doc["username"]}
 
 def user_to_out(doc) -> UserOut:                 # Mongo 문서 → UserOut
-    return UserOut(id=str(doc["_id"]), email=doc["email"], username=doc["username"])
+    return UserOut(**user_to_dict(doc))
+
+
+# -----------------------------
+# 빠른 JSON 응답 (선택)
+# -----------------------------
+# FAST_JSON=1 이면 목록/상세 GET 이 pydantic 모델 생성 → response_model 재검증 → 표준 json 인코딩을
+# 건너뛰고 *_to_dict 결과를 orjson 으로 바로 바이트로 만든다.
+# 데코레이터의 response_model 은 그대로라 OpenAPI 스키마는 같다.
+try:
+    import orjson
+except ImportError:  # 설치돼 있지 않으면 기존 경로
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1" and orjson is not None
+
+def fast_json(content, response: Optional[Response] = None) -> Response:
+    """content 를 바로 직렬화한 응답. response 에 설정해 둔 헤더(커서/ETag 등)를 옮겨 담는다."""
+    out = Response(orjson.dumps(content), media_type="application/json")
+    if response is not None:
+        out.headers.update(response.headers)
+    return out
+
+
+# -----------------------------
+# 커서(keyset) 페이지네이션 도우미
+# -----------------------------
+def encode_cursor(oid: ObjectId) -> str:         # ObjectId → 불투명 커서 문자열
+    return base64.urlsafe_b64encode(oid.binary).rstrip(b"=").decode()
+
+def decode_cursor(token: str) -> ObjectId:       # 커서 문자열(또는 ObjectId hex) → ObjectId
+    if len(token) == 24 and ObjectId.is_valid(token):
+        return ObjectId(token)
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raw = b""
+    if len(raw) != 12:
+        raise HTTPException(400, "invalid cursor")
+    return ObjectId(raw)
+
+# 댓글은 (created_at, _id) 오름차순이라 커서에 두 값을 모두 담는다.
+def encode_comment_cursor(doc) -> str:
+    created = doc["created_at"]
+    if created.tzinfo is None:                   # Mongo 는 naive UTC 로 돌려줌
+        created = created.replace(tzinfo=timezone.utc)
+    raw = f"{int(created.timestamp() * 1000)}.{doc['_id']}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_comment_cursor(token: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ms, oid = raw.split(".")
+        return datetime.fromtimestamp(int(ms) / 1000, timezone.utc), ObjectId(oid)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(400, "invalid cursor")
+
+def comments_range(oid: ObjectId, after: Optional[str] = None, before: Optional[str] = None) -> dict:
+    """post 의 댓글 중 after 커서 이후 / before 커서 이전 구간 필터 (없으면 전체)."""
+    query = {"post_id": oid}
+    for token, op in ((after, "$gt"), (before, "$lt")):
+        if token:
+            created, cid = decode_comment_cursor(token)
+            query.setdefault("$and", []).append({"$or": [
+                {"created_at": {op: created}},
+                {"created_at": created, "_id": {op: cid}},
+            ]})
+    return query
+
+# -----------------------------
+# 조건부 GET (ETag / If-None-Match)
+# -----------------------------
+# 글 문서는 ver 가 바뀔 때마다 +1, 목록은 페이지에 든 (id, ver) 들로 ETag 를 만든다.
+# If-None-Match 가 오면 ver 만 프로젝션해서 비교 → 같으면 직렬화 없이 304.
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def docs_etag(seed: tuple, docs: list) -> str:
+    return make_etag(*seed, *(f"{d['_id']}:{d.get('ver', 0)}" for d in docs))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+    return "*" in tags or etag in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+def comment_to_json(doc) -> dict:              # 스트리밍용: 모델 생성 없이 바로 JSON 호환 dict
+    created = doc["created_at"]
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return {**comment_to_dict(doc), "created_at": created.isoformat()}
 
 
 # =========================
 # 앱 시작 시 1회 실행 훅
 # =========================
+MIGRATE_LIKES_ON_STARTUP = os.getenv("MIGRATE_LIKES_ON_STARTUP", "1") == "1"
+MIGRATE_LIKES_MARKER = "migrate_likes"     # counters 문서: 이전이 끝났으면 done=True (지우면 다시 스캔)
+background_tasks = set()  # create_task 결과가 GC 되지 않도록 참조 보관
+
+def start_background(coro) -> asyncio.Task:
+    # 빈 컨텍스트로 실행: 요청 중에 시작돼도 그 요청의 mongo_calls 등을 물려받지 않게
+    task = asyncio.create_task(coro, context=Context())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def migrate_embedded_likes(batch_size: int = 500) -> None:
+    """
+    posts.likes 배열(레거시) → post_likes 컬렉션 온라인 이전.
+    - 배열의 사용자마다 upsert(멱등) 후, 배열이 그 사이 바뀌지 않았을 때만 $unset
+    - likes_count 는 (post_likes ∪ 배열) 크기로 유지돼 왔으므로 그대로 두고,
+      필드가 없던 옛 글만 $max 로 배열 길이를 채움
+    - 여러 워커가 동시에 돌려도 안전(멱등)
+    - 끝까지 훑고 나면 counters 에 완료 표시를 남겨 다음 기동부터는 스캔하지 않음
+    """
+    if await counters.find_one({"_id": MIGRATE_LIKES_MARKER, "done": True}):
+        return
+    moved = 0
+    cursor = posts.find({"likes.0": {"$exists": True}}, {"likes": 1}).batch_size(batch_size)
+    async for doc in cursor:
+        arr = doc["likes"]
+        await post_likes.bulk_write([
+            UpdateOne(
+                {"post_id": doc["_id"], "user_id": uid},
+                {"$setOnInsert": {"created_at": doc["_id"].generation_time}},
+                upsert=True,
+            )
+            for uid in arr
+        ], ordered=False)
+        await posts.update_one(
+            {"_id": doc["_id"], "likes": arr},
+            {"$unset": {"likes": ""}, "$max": {"likes_count": len(arr)}, "$inc": {"ver": 1}},  # 캐시된 ETag 무효화
+        )
+        post_cache.invalidate(doc["_id"])
+        moved += 1
+    await counters.update_one(
+        {"_id": MIGRATE_LIKES_MARKER},
+        {"$set": {"done": True, "moved": moved, "finished_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    if moved:
+        print(f"[MIGRATE] moved embedded likes of {moved} posts to post_likes")
+
 @app.on_event("startup")
 async def on_startup():
     # users: 이메일/아이디는 중복 금지
@@ -248,32 +1136,917 @@ async def on_startup():
     await verifs.create_index("expires_at", expireAfterSeconds=0)          # 6자리 코드 TTL
     await veri_tokens.create_index([("email", 1), ("expires_at", 1)])
     await veri_tokens.create_index("expires_at", expireAfterSeconds=0)     # 이메일 인증 링크 TTL
-    await comments.create_index([("post_id", 1), ("created_at", -1)])
+    # 미사용 코드/토큰 다이제스트는 유일 (레거시 bcrypt 레코드는 다이제스트가 없어 제외)
+    await verifs.create_index(
+        "code_digest", unique=True,
+        partialFilterExpression={"code_digest": {"$exists": True}, "used": False},
+    )
+    await veri_tokens.create_index(
+        "token_digest", unique=True,
+        partialFilterExpression={"token_digest": {"$exists": True}, "used": False},
+    )
+    # 댓글 keyset 페이지네이션 (created_at, _id) 양방향 모두 이 인덱스로 탐색
+    await comments.create_index([("post_id", 1), ("created_at", 1), ("_id", 1)])
+    try:    # 예전 (post_id, created_at desc) 인덱스는 위 인덱스를 역방향으로 타면 되므로 중복 — 쓰기 비용만 듦
+        await comments.drop_index([("post_id", 1), ("created_at", -1)])
+    except OperationFailure:
+        pass    # 이미 없음(새로 만든 DB 또는 다른 워커가 먼저 지움)
+    await post_likes.create_index([("post_id", 1), ("user_id", 1)], unique=True)
+    await posts.create_index("deleted_at", sparse=True)                      # 정리 대기 글 찾기용
+    await posts.create_index([("author_id", 1), ("_id", -1)])              # 작성자별 목록/소유자 확인
+    await comments.create_index("author_id")                                # 작성자 이름 동기화용
+    # 검색: 한국어 형태소 분석기가 없어 언어는 none(공백/구두점 기준 토큰), 제목 가중치 ↑
+    await posts.create_index(
+        [("title", "text"), ("body", "text")],
+        weights={"title": SEARCH_TITLE_WEIGHT, "body": 1},
+        default_language="none",
+        name="posts_text",
+    )
+    if SEARCH_NGRAM:
+        await posts.create_index("search_grams")
+        start_background(backfill_search_grams())
+    await purge_jobs.create_index([("status", 1), ("lease_until", 1)])
+    await mail_outbox.create_index([("status", 1), ("due_at", 1)])
+    await mail_outbox.create_index("expires_at", expireAfterSeconds=0)       # 코드/링크 만료와 함께 삭제
+    await purge_jobs.create_index("finished_at", expireAfterSeconds=86400)   # 끝난 작업은 하루 뒤 삭제
+    if RATE_LIMIT_BACKEND == "mongo":
+        await rate_limits.create_index("expires_at", expireAfterSeconds=0)  # 지난 레이트리밋 버킷 TTL
     # posts: _id 인덱스는 MongoDB가 자동으로 {_id: 1} 생성함. 따로 만들 필요 없음.
+    if MIGRATE_LIKES_ON_STARTUP:
+        start_background(migrate_embedded_likes())
+    if not await counters.find_one({"_id": "posts"}):
+        await reconcile_post_total()        # 카운터 시드(이후 create/delete_post 가 $inc 로 유지)
+    start_background(reconcile_loop())
+    start_background(purge_worker())
+    start_background(mailer.run())
+    start_background(event_hub.heartbeat())
+    if METRICS_ENABLED:
+        start_background(watch_loop_lag())
+        if METRICS_SHARE:
+            await metrics_snapshots.create_index("updated_at", expireAfterSeconds=METRICS_STALE_SECONDS * 10)
+            start_background(flush_metrics())
+    if SSE_SOURCE == "changestream":
+        await event_log.create_index("created_at", expireAfterSeconds=SSE_EVENT_TTL_SECONDS)
+        start_background(event_hub.watch())
+    start_background(resume_username_sync())
+    start_background(hot_feed.run())
+    if counter_agg:
+        counter_agg.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if counter_agg:
+        await counter_agg.close()          # 진행 중 flush 를 기다린 뒤 모아 둔 카운터 반영
+    hasher.shutdown()
+    await mailer.close()
+    for task in list(background_tasks):
+        task.cancel()
+
+
+# =========================
+# 프로세스 내 캐시
+# =========================
+class TTLCache:
+    """
+    크기 제한(LRU) + 만료(TTL)가 있는 단순 캐시. 단일 이벤트 루프에서만 쓰므로 락 없음.
+    hits/misses 카운터로 적중률을 확인할 수 있다.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+POST_CACHE_TTL_SECONDS = float(os.getenv("POST_CACHE_TTL_SECONDS", "5"))  # 다른 워커 변경 반영까지 최대 지연
+POST_CACHE_MAX = int(os.getenv("POST_CACHE_MAX", "2000"))
+
+class PostCache:
+    """
+    글 단건 read-through 캐시.
+    - 같은 글에 대한 동시 miss 는 하나의 find_one 으로 합침(single-flight)
+      조회는 별도 Task 로 돌리고 모든 호출자가 shield 해서 기다림 → 먼저 온 요청이 취소돼도 나머지는 결과를 받음
+    - 이 프로세스의 쓰기 핸들러가 invalidate() 호출, 다른 워커 변경은 TTL 로 반영
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize, ttl)
+        self.queries = 0      # 실제 Mongo 조회 수
+        self.coalesced = 0    # 진행 중 조회에 합류해 아낀 조회 수
+        self._inflight: dict = {}  # oid -> Task
+
+    async def get(self, oid: ObjectId) -> Optional[dict]:
+        doc = self.cache.get(oid)
+        if doc is not None:
+            return doc
+        task = self._inflight.get(oid)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._load(oid))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # 기다리는 쪽이 다 취소돼도 경고 안 남게
+            background_tasks.add(task)                                        # invalidate 로 빠져도 GC 되지 않게
+            task.add_done_callback(background_tasks.discard)
+            self._inflight[oid] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, oid: ObjectId) -> Optional[dict]:
+        me = asyncio.current_task()
+        try:
+            doc = await posts.find_one({"_id": oid, **NOT_DELETED}, POST_HEAVY_FIELDS)  # 레거시 likes/검색 n-gram 은 읽지 않음
+            self.queries += 1
+        finally:
+            current = self._inflight.get(oid) is me
+            if current:
+                del self._inflight[oid]
+        # 조회 도중 invalidate 됐다면 결과를 캐시에 넣지 않음(오래된 값일 수 있음)
+        if doc is not None and current:
+            self.cache.set(oid, doc)
+        return doc
+
+    def invalidate(self, oid: ObjectId) -> None:
+        self.cache.pop(oid)
+        self._inflight.pop(oid, None)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "queries": self.queries, "coalesced": self.coalesced}
+
+post_cache = PostCache(POST_CACHE_MAX, POST_CACHE_TTL_SECONDS)
+
+
+# =========================
+# 전체 글 수 카운터
+# =========================
+# count_documents({}) 는 매번 컬렉션 전체를 훑으므로, create/delete_post 가
+# counters 문서를 같이 $inc 하고 주기적으로 실제 개수와 맞춘다(드리프트 복구).
+POST_TOTAL_CACHE_SECONDS = float(os.getenv("POST_TOTAL_CACHE_SECONDS", "2"))
+COUNTER_RECONCILE_SECONDS = float(os.getenv("COUNTER_RECONCILE_SECONDS", "600"))
+
+total_cache = TTLCache(1, POST_TOTAL_CACHE_SECONDS)
+
+async def bump_post_total(delta: int, session=None) -> None:
+    await counters.update_one({"_id": "posts"}, {"$inc": {"n": delta}}, upsert=True, session=session)
+
+async def reconcile_post_total() -> int:
+    n = await posts.count_documents(NOT_DELETED)
+    await counters.update_one(
+        {"_id": "posts"},
+        {"$set": {"n": n, "reconciled_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    total_cache.pop("posts")
+    return n
+
+async def get_post_total() -> int:
+    n = total_cache.get("posts")
+    if n is None:
+        doc = await counters.find_one({"_id": "posts"})
+        n = int(doc["n"]) if doc else await reconcile_post_total()   # 첫 실행 시 시드
+        total_cache.set("posts", n)
+    return n
+
+async def reconcile_loop() -> None:
+    while True:
+        await asyncio.sleep(COUNTER_RECONCILE_SECONDS)
+        try:
+            await reconcile_post_total()
+        except Exception as e:  # 다음 주기에 다시 시도
+            print(f"[COUNTER] reconcile failed: {e!r}")
+
+
+# =========================
+# 메일 발송 (outbox + 백그라운드 디스패처)
+# =========================
+# 핸들러는 mail_outbox 에 문서 1건만 넣고(insert 1회) 바로 응답 → 가입/로그인 지연이 메일 서버와 무관.
+# 디스패처가 lease 로 작업을 배치 단위로 집어 유지 중인 SMTP 연결로 보낸다.
+# - 실패 시 지수 백오프(+지터)로 재시도, MAIL_MAX_ATTEMPTS 회를 넘으면 dead 로 남김(dead-letter)
+# - 보냈거나 포기한 메일은 본문(코드·링크)을 지움, 문서는 expires_at TTL 로 삭제
+#   (dead 는 expires_at 을 MAIL_DEAD_RETENTION_DAYS 뒤로 미뤄 그동안 남겨 둠)
+# - 코드/링크가 이미 만료된 메일은 보내지 않음
+# - 여러 워커가 같이 돌려도 find_one_and_update 로 한 건씩 가져가므로 중복 발송 없음
+# 로컬 테스트: python -m aiosmtpd -n -l localhost:8025 + MAIL_BACKEND=smtp SMTP_PORT=8025 SMTP_STARTTLS=0
+# (자동 테스트: tests/test_smtp_pool.py 가 aiosmtpd Controller 로 같은 구성을 띄움)
+try:
+    import aiosmtplib
+except ImportError:  # console 백엔드만 쓸 때는 없어도 됨
+    aiosmtplib = None
+
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "console")                    # console(stdout) | smtp
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", os.getenv("EMAIL_USER", ""))
+SMTP_PASS = os.getenv("SMTP_PASS", os.getenv("EMAIL_PASS", ""))
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER or "no-reply@localhost")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+MAIL_CONCURRENCY = int(os.getenv("MAIL_CONCURRENCY", "2"))              # 동시 SMTP 연결 수
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "5"))
+MAIL_RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "600"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "10"))
+MAIL_LEASE_SECONDS = 60
+MAIL_DEAD_RETENTION_DAYS = int(os.getenv("MAIL_DEAD_RETENTION_DAYS", "7"))   # dead 메일 보관 기간(원인 확인용)
+
+class SmtpPool:
+    """
+    SMTP 연결을 최대 size 개까지 열어 두고 재사용한다.
+    연결/STARTTLS/로그인은 처음 또는 서버가 끊었을 때만 다시 한다.
+    """
+    def __init__(self, size: int):
+        self.slots = asyncio.Semaphore(size)
+        self.idle: list = []
+
+    async def connect(self):
+        if aiosmtplib is None:
+            raise RuntimeError("MAIL_BACKEND=smtp requires aiosmtplib")
+        conn = aiosmtplib.SMTP(hostname=SMTP_HOST, port=SMTP_PORT, timeout=SMTP_TIMEOUT, start_tls=SMTP_STARTTLS)
+        await conn.connect()
+        if SMTP_USER:
+            await conn.login(SMTP_USER, SMTP_PASS)
+        return conn
+
+    async def send(self, msg: EmailMessage) -> None:
+        async with self.slots:
+            conn = None
+            while self.idle and conn is None:
+                c = self.idle.pop()
+                if c.is_connected:
+                    conn = c
+            if conn is not None:
+                try:
+                    await conn.send_message(msg)
+                    self.idle.append(conn)
+                    return
+                except aiosmtplib.SMTPServerDisconnected:   # 쉬는 동안 서버가 끊은 연결 → 새 연결로 한 번 더
+                    conn.close()
+                except BaseException:
+                    conn.close()
+                    raise
+            conn = await self.connect()
+            try:
+                await conn.send_message(msg)
+            except BaseException:
+                conn.close()
+                raise
+            self.idle.append(conn)
+
+    async def close(self) -> None:
+        while self.idle:
+            conn = self.idle.pop()
+            try:
+                await conn.quit()
+            except Exception:
+                conn.close()
+
+class MailOutbox:
+    def __init__(self):
+        self.pool = SmtpPool(MAIL_CONCURRENCY)
+        self.wakeup = asyncio.Event()   # 새 메일이 들어오면 디스패처를 바로 깨움
+
+    async def enqueue(self, to: str, subject: str, body: str, ttl: timedelta) -> None:
+        now = datetime.now(timezone.utc)
+        await mail_outbox.insert_one({
+            "to": to,
+            "subject": subject,
+            "body": body,
+            "status": "pending",
+            "attempts": 0,
+            "due_at": now,
+            "expires_at": now + ttl,
+            "created_at": now,
+        })
+        self.wakeup.set()
+
+    async def deliver(self, job: dict) -> None:
+        if MAIL_BACKEND != "smtp":
+            print(f"[MAIL] to={job['to']} subject={job['subject']} body={job['body']!r}")
+            return
+        msg = EmailMessage()
+        msg["From"] = SMTP_FROM
+        msg["To"] = job["to"]
+        msg["Subject"] = job["subject"]
+        msg.set_content(job["body"])
+        await self.pool.send(msg)
+
+    async def claim(self) -> Optional[dict]:
+        # attempts 는 가져갈 때 올림 → 발송 중 죽는 메일도 결국 dead 로 빠짐
+        now = datetime.now(timezone.utc)
+        return await mail_outbox.find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "due_at": {"$lte": now}, "expires_at": {"$gt": now}},
+            {"$set": {"status": "sending", "due_at": now + timedelta(seconds=MAIL_LEASE_SECONDS)},
+             "$inc": {"attempts": 1}},
+            sort=[("due_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def process(self, job: dict) -> None:
+        try:
+            await self.deliver(job)
+        except Exception as e:
+            now = datetime.now(timezone.utc)
+            if job["attempts"] >= MAIL_MAX_ATTEMPTS:
+                await mail_outbox.update_one({"_id": job["_id"]}, {
+                    "$set": {"status": "dead", "last_error": repr(e), "updated_at": now,
+                             "expires_at": now + timedelta(days=MAIL_DEAD_RETENTION_DAYS)},
+                    "$unset": {"body": ""},
+                })
+                print(f"[MAIL] giving up to={job['to']} after {job['attempts']} attempts: {e!r}")
+                return
+            delay = min(MAIL_RETRY_MAX_SECONDS, MAIL_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))
+            await mail_outbox.update_one({"_id": job["_id"]}, {"$set": {
+                "status": "pending",
+                "due_at": now + timedelta(seconds=delay * random.uniform(0.5, 1.0)),
+                "last_error": repr(e),
+                "updated_at": now,
+            }})
+            return
+        await mail_outbox.update_one({"_id": job["_id"]}, {
+            "$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)},
+            "$unset": {"body": ""},
+        })
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            try:
+                while True:
+                    batch = []
+                    while len(batch) < MAIL_BATCH_SIZE and (job := await self.claim()) is not None:
+                        batch.append(job)
+                    if not batch:
+                        break
+                    # 동시 발송 수는 SmtpPool 슬롯(MAIL_CONCURRENCY)이 제한
+                    await asyncio.gather(*(self.process(j) for j in batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # lease 가 끝나면 다시 잡힘
+                print(f"[MAIL] dispatcher failed: {e!r}")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), MAIL_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+mailer = MailOutbox()
+
+
+# =========================
+# 글 삭제 후 정리(백그라운드)
+# =========================
+# delete_post 는 deleted_at 만 찍고(소프트 삭제) purge_jobs 에 작업을 넣는다.
+# 워커가 댓글/좋아요를 배치로 지우고 마지막에 글 문서를 지운다.
+# - 작업 문서에 진행량 기록 → 재시작 시 이어서(lease 만료된 running 작업 재획득)
+# - 배치 사이 쉬어 가며(스로틀) WiredTiger 캐시를 한 번에 밀어내지 않음
+NOT_DELETED = {"deleted_at": {"$exists": False}}     # 살아 있는 글 필터
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("PURGE_BATCH_PAUSE_SECONDS", "0.05"))
+PURGE_POLL_SECONDS = float(os.getenv("PURGE_POLL_SECONDS", "30"))
+PURGE_LEASE_SECONDS = 60
+
+purge_wakeup = asyncio.Event()  # 새 작업이 생기면 워커를 바로 깨움
+
+async def enqueue_purge(oid: ObjectId, author_id: str, session=None) -> None:
+    now = datetime.now(timezone.utc)
+    await purge_jobs.update_one(
+        {"_id": oid},
+        {"$setOnInsert": {
+            "author_id": author_id,
+            "status": "pending",
+            "comments_deleted": 0,
+            "likes_deleted": 0,
+            "lease_until": now,
+            "created_at": now,
+        }},
+        upsert=True,
+        session=session,
+    )
+
+async def purge_in_batches(coll, flt: dict, job_id: ObjectId, progress_field: str) -> None:
+    while True:
+        ids = [d["_id"] for d in await coll.find(flt, {"_id": 1}).limit(PURGE_BATCH_SIZE).to_list(None)]
+        if not ids:
+            return
+        res = await coll.delete_many({"_id": {"$in": ids}})
+        now = datetime.now(timezone.utc)
+        await purge_jobs.update_one({"_id": job_id}, {
+            "$inc": {progress_field: res.deleted_count},
+            "$set": {"updated_at": now, "lease_until": now + timedelta(seconds=PURGE_LEASE_SECONDS)},
+        })
+        await asyncio.sleep(PURGE_BATCH_PAUSE_SECONDS)
+
+async def claim_purge_job() -> Optional[dict]:
+    now = datetime.now(timezone.utc)
+    return await purge_jobs.find_one_and_update(
+        {"status": {"$in": ["pending", "running"]}, "lease_until": {"$lte": now}},
+        {"$set": {"status": "running", "updated_at": now,
+                  "lease_until": now + timedelta(seconds=PURGE_LEASE_SECONDS)}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def run_purge_job(job: dict) -> None:
+    oid = job["_id"]
+    await purge_in_batches(comments, {"post_id": oid}, oid, "comments_deleted")
+    await purge_in_batches(post_likes, {"post_id": oid}, oid, "likes_deleted")
+    await posts.delete_one({"_id": oid, "deleted_at": {"$exists": True}})
+    await purge_jobs.update_one({"_id": oid}, {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}})
+
+async def purge_worker() -> None:
+    # 소프트 삭제 직후 죽어서 작업이 안 들어간 글 복구
+    async for d in posts.find({"deleted_at": {"$exists": True}}, {"author_id": 1}):
+        await enqueue_purge(d["_id"], d.get("author_id", ""))
+    while True:
+        purge_wakeup.clear()
+        try:
+            while (job := await claim_purge_job()) is not None:
+                await run_purge_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # lease 가 끝나면 다시 잡힘
+            print(f"[PURGE] failed: {e!r}")
+        try:
+            await asyncio.wait_for(purge_wakeup.wait(), PURGE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+# =========================
+# 작성자 이름 동기화(백그라운드)
+# =========================
+# posts/comments 에 비정규화된 author_username 을 이름 변경 후 배치로 갱신.
+# 진행 중 표시(username_sync_pending)를 사용자 문서에 두어 재시작 시 이어서 처리.
+# 다른 워커의 principal_cache 는 USER_CACHE_TTL_SECONDS 동안 옛 이름을 들고 있을 수 있어
+# 그 사이 새로 쓴 글/댓글은 옛 이름으로 저장된다 → 캐시가 다 만료된 뒤 한 번 더 훑고 나서 완료 처리.
+USERNAME_SYNC_BATCH_SIZE = int(os.getenv("USERNAME_SYNC_BATCH_SIZE", "500"))
+USERNAME_SYNC_SLACK_SECONDS = float(os.getenv("USERNAME_SYNC_SLACK_SECONDS", "5"))  # 만료 직전에 시작된 요청 여유
+
+async def sync_username_pass(uid: ObjectId) -> Optional[str]:
+    """author_username 이 현재 이름과 다른 글/댓글을 배치로 갱신. 반환: 맞춘 이름(사용자 없으면 None)"""
+    user = await users.find_one({"_id": uid}, {"username": 1})
+    if not user:
+        return None
+    username = user["username"]          # 그 사이 또 바뀌었으면 최신 이름으로
+    for coll in (posts, comments):
+        flt = {"author_id": str(uid), "author_username": {"$ne": username}}
+        while True:
+            ids = [d["_id"] for d in await coll.find(flt, {"_id": 1}).limit(USERNAME_SYNC_BATCH_SIZE).to_list(None)]
+            if not ids:
+                break
+            await coll.update_many({"_id": {"$in": ids}}, {"$set": {"author_username": username}, "$inc": {"ver": 1}})
+            await asyncio.sleep(PURGE_BATCH_PAUSE_SECONDS)
+    return username
+
+async def sync_author_username(uid: ObjectId) -> None:
+    if await sync_username_pass(uid) is None:
+        return
+    # 다른 워커가 캐시된 옛 이름으로 쓴 글/댓글 정리
+    await asyncio.sleep(USER_CACHE_TTL_SECONDS + USERNAME_SYNC_SLACK_SECONDS)
+    username = await sync_username_pass(uid)
+    if username is None:
+        return
+    # 끝나는 동안 이름이 또 바뀌지 않았을 때만 완료 처리
+    await users.update_one({"_id": uid, "username": username}, {"$unset": {"username_sync_pending": ""}})
+
+async def resume_username_sync() -> None:
+    uids = [u["_id"] async for u in users.find({"username_sync_pending": True}, {"_id": 1})]
+    # 사용자마다 캐시 만료 대기가 있으므로 한꺼번에 진행
+    results = await asyncio.gather(*(sync_author_username(uid) for uid in uids), return_exceptions=True)
+    for uid, res in zip(uids, results):
+        if isinstance(res, Exception):
+            print(f"[USERNAME] sync failed for {uid}: {res!r}")
+
+
+# =========================
+# 좋아요/댓글 카운터 쓰기 지연(선택)
+# =========================
+# 인기 글 하나에 $inc 가 몰리면 그 문서가 쓰기 경합 지점이 된다.
+# 켜면 글별 증감을 메모리에 모았다가 주기/크기 기준으로 bulk_write 한 번에 반영.
+# - 손실 구간: 최대 COUNTER_FLUSH_SECONDS (비정상 종료 시), 정상 종료 시 flush
+# - 그동안 카운트 표시는 최대 그만큼 늦을 수 있음(reconcile 대상 아님)
+# - likes 배열 이전(migrate_embedded_likes)이 끝난 뒤에 켤 것
+COUNTER_WRITE_BEHIND = os.getenv("COUNTER_WRITE_BEHIND", "0") == "1"
+COUNTER_FLUSH_SECONDS = float(os.getenv("COUNTER_FLUSH_SECONDS", "0.5"))
+COUNTER_FLUSH_MAX_POSTS = int(os.getenv("COUNTER_FLUSH_MAX_POSTS", "1000"))
+
+class CounterAggregator:
+    def __init__(self, interval: float, max_posts: int):
+        self.interval = interval
+        self.max_posts = max_posts
+        self.flushes = 0
+        self.coalesced = 0     # 합쳐져서 아낀 $inc 수
+        self._pending: dict = {}   # oid -> {field: delta}
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, oid: ObjectId, field: str, delta: int) -> None:
+        fields = self._pending.get(oid)
+        if fields is None:
+            fields = self._pending[oid] = {}
+        else:
+            self.coalesced += 1
+        fields[field] = fields.get(field, 0) + delta
+        if len(self._pending) >= self.max_posts:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        items = [(oid, fields) for oid, fields in batch.items() if any(fields.values())]
+        ops = [UpdateOne({"_id": oid}, {"$inc": {**fields, "ver": 1}}) for oid, fields in items]
+        try:
+            if ops:
+                await posts.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # unordered: 나머지는 이미 반영됨 → 실패한 op 만 다음 flush 에 다시 합침
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            self.requeue(items[i] for i in sorted(failed))
+            raise
+        except Exception:
+            # 반영 여부를 모름(네트워크 등) → 전부 다시 시도
+            self.requeue(items)
+            raise
+        self.flushes += 1
+        for oid in batch:
+            post_cache.invalidate(oid)
+
+    def requeue(self, items) -> None:
+        for oid, fields in items:
+            for field, delta in fields.items():
+                self.add(oid, field, delta)
+
+    async def run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[COUNTER] flush failed: {e!r}")
+
+    def start(self) -> None:
+        self._task = start_background(self.run())
+
+    async def close(self) -> None:
+        """종료 시: 진행 중인 flush 는 취소하지 않고 끝나길 기다린 뒤, 남은 것을 마지막으로 반영."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+
+counter_agg = CounterAggregator(COUNTER_FLUSH_SECONDS, COUNTER_FLUSH_MAX_POSTS) if COUNTER_WRITE_BEHIND else None
+
+
+# =========================
+# 검색
+# =========================
+# 기본: title(가중치 10) + body 텍스트 인덱스. 한국어는 형태소 분석이 없어서
+# "게시판에" 같은 어절이 "게시판" 으로 안 잡히므로, SEARCH_NGRAM=1 이면
+# 글 저장 시 2-gram 배열을 같이 저장하고 그 멀티키 인덱스로 부분 일치 검색한다.
+SEARCH_NGRAM = os.getenv("SEARCH_NGRAM", "0") == "1"
+SEARCH_NGRAM_BODY_CHARS = int(os.getenv("SEARCH_NGRAM_BODY_CHARS", "2000"))  # 본문은 앞부분만 색인
+SEARCH_TITLE_WEIGHT = 10
+
+def make_grams(text: str) -> List[str]:
+    grams = set()
+    for tok in re.findall(r"\w+", text.lower()):
+        if len(tok) == 1:
+            grams.add(tok)
+        else:
+            grams.update(tok[i:i + 2] for i in range(len(tok) - 1))
+    return sorted(grams)
+
+def search_fields(title: str, body: str) -> dict:
+    """create/update_post 가 문서에 같이 저장할 검색용 필드 (n-gram 꺼져 있으면 없음)."""
+    if not SEARCH_NGRAM:
+        return {}
+    title_grams = make_grams(title)
+    return {
+        "title_grams": title_grams,
+        "search_grams": sorted(set(title_grams) | set(make_grams(body[:SEARCH_NGRAM_BODY_CHARS]))),
+    }
+
+async def backfill_search_grams(batch_size: int = 500) -> None:
+    """n-gram 을 켜기 전에 쓰인 글에 검색 필드 채우기(멱등)."""
+    filled = 0
+    cursor = posts.find({"title_grams": {"$exists": False}}, {"title": 1, "body": 1}).batch_size(batch_size)
+    async for d in cursor:
+        await posts.update_one({"_id": d["_id"]}, {"$set": search_fields(d["title"], d["body"])})
+        filled += 1
+    if filled:
+        print(f"[SEARCH] backfilled n-grams for {filled} posts")
+
+# 검색 결과는 (score, _id) 내림차순 → 커서에 두 값을 담는다
+def encode_search_cursor(score: float, oid: ObjectId) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}:{oid}".encode()).rstrip(b"=").decode()
+
+def decode_search_cursor(token: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        score, oid = raw.split(":")
+        return float(score), ObjectId(oid)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(400, "invalid cursor")
+
+
+# =========================
+# 인기(hot) 피드
+# =========================
+# 점수 = log10(좋아요*2 + 댓글 + 1) + (작성시각 - 기준시각) / HOT_DECAY_SECONDS  (Reddit 방식)
+# 시간이 지나도 점수가 변하지 않고(새 글이 더 큰 기준값을 받는 것으로 감쇠) 카운터가 바뀔 때만 변한다
+# → 재정렬 사이에도 커서의 (score, _id) 경계가 그대로 유효(페이지 간 중복/누락 없음)
+# 요청마다 전체를 계산하지 않도록 최근 HOT_WINDOW_HOURS 글의 카운터를 메모리에 들고
+# - HOT_REFRESH_SECONDS 마다 DB 에서 다시 읽고(다른 워커 변경 반영)
+# - 이 워커의 좋아요/댓글 이벤트로 즉시 증감, 정렬은 최대 HOT_RERANK_SECONDS 마다
+# 페이지는 (score, _id) 커서로 정렬 배열을 이분 탐색 → 최신순 페이지와 같은 비용(글 조회 1회)
+HOT_REFRESH_SECONDS = float(os.getenv("HOT_REFRESH_SECONDS", "60"))
+HOT_RERANK_SECONDS = float(os.getenv("HOT_RERANK_SECONDS", "5"))
+HOT_WINDOW_HOURS = float(os.getenv("HOT_WINDOW_HOURS", "72"))
+HOT_MAX_POSTS = int(os.getenv("HOT_MAX_POSTS", "5000"))
+HOT_DECAY_SECONDS = float(os.getenv("HOT_DECAY_SECONDS", "45000"))   # 이만큼 늦게 쓴 글 = 반응 10배와 동급
+HOT_EPOCH = 1704067200                                                # 2024-01-01 UTC (고정)
+
+class HotFeed:
+    def __init__(self):
+        self._stats: dict = {}   # oid -> [likes, comments, created_ts]
+        self._keys: list = []    # [(-score, oid_str)] 오름차순 = 점수 내림차순
+        self._ids: list = []     # _keys 와 같은 순서의 ObjectId
+        self._ranked_at = 0.0
+        self._loaded = False
+        self._dirty = False
+
+    @staticmethod
+    def score(likes: int, comments: int, created_ts: float) -> float:
+        return math.log10(max(1, likes * 2 + comments + 1)) + (created_ts - HOT_EPOCH) / HOT_DECAY_SECONDS
+
+    async def refresh(self) -> None:
+        since = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(hours=HOT_WINDOW_HOURS))
+        docs = await posts.find(
+            {"_id": {"$gte": since}, **NOT_DELETED},
+            {"likes_count": 1, "comments_count": 1},
+        ).sort("_id", -1).limit(HOT_MAX_POSTS).to_list(None)
+        self._stats = {
+            d["_id"]: [int(d.get("likes_count", 0)), int(d.get("comments_count", 0)),
+                       d["_id"].generation_time.timestamp()]
+            for d in docs
+        }
+        self._loaded = True
+        self._rerank()
+
+    def _rerank(self) -> None:
+        ranked = sorted(
+            (-self.score(l, c, t), str(oid), oid) for oid, (l, c, t) in self._stats.items()
+        )
+        self._keys = [(k, s) for k, s, _ in ranked]
+        self._ids = [oid for _, _, oid in ranked]
+        self._ranked_at = time.monotonic()
+        self._dirty = False
+
+    def add(self, oid: ObjectId) -> None:
+        self._stats[oid] = [0, 0, oid.generation_time.timestamp()]
+        self._dirty = True
+
+    def remove(self, oid: ObjectId) -> None:
+        if self._stats.pop(oid, None) is not None:
+            self._dirty = True
+
+    def bump(self, oid: ObjectId, likes: int = 0, comments: int = 0) -> None:
+        st = self._stats.get(oid)
+        if st is not None:
+            st[0] += likes
+            st[1] += comments
+            self._dirty = True
+
+    async def page(self, limit: int, cursor: Optional[str]) -> tuple:
+        """(이번 페이지 ObjectId 목록, 다음 커서)"""
+        if not self._loaded:
+            await self.refresh()
+        elif self._dirty and time.monotonic() - self._ranked_at >= HOT_RERANK_SECONDS:
+            self._rerank()
+        start = 0
+        if cursor:
+            last_score, last_id = decode_search_cursor(cursor)
+            start = bisect.bisect_right(self._keys, (-last_score, str(last_id)))
+        ids = self._ids[start:start + limit]
+        next_cursor = None
+        if start + limit < len(self._ids):
+            neg, _ = self._keys[start + limit - 1]
+            next_cursor = encode_search_cursor(-neg, ids[-1])
+        return ids, next_cursor
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"[HOT] refresh failed: {e!r}")
+            await asyncio.sleep(HOT_REFRESH_SECONDS)
+
+hot_feed = HotFeed()
+
+async def find_posts_in_order(ids: List[ObjectId], projection) -> list:
+    """ids 순서를 유지해서 글 조회(삭제된 글은 빠짐)."""
+    if not ids:
+        return []
+    docs = await posts.find({"_id": {"$in": ids}, **NOT_DELETED}, projection).to_list(None)
+    by_id = {d["_id"]: d for d in docs}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+# =========================
+# 실시간 이벤트 (SSE)
+# =========================
+# GET /posts/{pid}/events 구독자에게 댓글 작성/삭제, 좋아요 증감을 푸시한다.
+# 글이 삭제되면 post_deleted 이벤트를 마지막으로 보내고 그 글의 구독을 모두 닫는다.
+# - local: 이 워커의 핸들러가 낸 이벤트만 프로세스 내 허브로 분배(단일 노드)
+# - changestream: 핸들러는 post_events 에 기록, 각 워커가 change stream 으로 받아 분배(레플리카셋 필요)
+# 구독자마다 크기 제한 큐 → 다 차면(느린 클라이언트) 끊고 dropped 이벤트를 보냄(클라이언트는 다시 조회).
+# 하트비트는 타이머 하나가 모든 큐에 넣어 구독자별 타이머/태스크가 없다.
+SSE_SOURCE = os.getenv("SSE_SOURCE", "local")                          # local | changestream
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", "10000"))    # 워커당
+SSE_EVENT_TTL_SECONDS = 3600                                             # post_events 보관(재개 토큰 유효 범위)
+SSE_PING = ": ping\n\n"
+
+class Subscriber:
+    __slots__ = ("queue", "dropped", "closed")
+
+    def __init__(self):
+        self.queue = asyncio.Queue(SSE_QUEUE_SIZE)
+        self.dropped = False
+        self.closed = False     # 글 삭제로 닫힘: 큐에 남은 이벤트까지만 보내고 종료
+
+class EventHub:
+    def __init__(self):
+        self._subs: dict = {}    # post oid -> set(Subscriber)
+        self.count = 0
+
+    def subscribe(self, oid: ObjectId) -> Subscriber:
+        if self.count >= SSE_MAX_SUBSCRIBERS:
+            raise HTTPException(503, "too many subscribers")
+        sub = Subscriber()
+        self._subs.setdefault(oid, set()).add(sub)
+        self.count += 1
+        return sub
+
+    def unsubscribe(self, oid: ObjectId, sub: Subscriber) -> None:
+        subs = self._subs.get(oid)
+        if subs is None or sub not in subs:
+            return
+        subs.discard(sub)
+        self.count -= 1
+        if not subs:
+            del self._subs[oid]
+
+    def publish(self, oid: ObjectId, kind: str, data: dict) -> None:
+        subs = self._subs.get(oid)
+        if not subs:
+            return
+        msg = f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"   # 구독자 수와 무관하게 1번 직렬화
+        for sub in list(subs):
+            try:
+                sub.queue.put_nowait(msg)
+            except asyncio.QueueFull:   # 못 따라오는 구독자는 끊음
+                sub.dropped = True
+                self.unsubscribe(oid, sub)
+        if kind == "post_deleted":
+            self.close(oid)
+
+    def close(self, oid: ObjectId) -> None:
+        """글의 구독자를 모두 떼어 냄. 각 스트림은 큐를 비운 뒤 스스로 끝난다."""
+        subs = self._subs.pop(oid, None)
+        if not subs:
+            return
+        self.count -= len(subs)
+        for sub in subs:
+            sub.closed = True
+
+    async def heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(SSE_HEARTBEAT_SECONDS)
+            for subs in list(self._subs.values()):
+                for sub in subs:
+                    if not sub.queue.full():
+                        sub.queue.put_nowait(SSE_PING)
+
+    async def watch(self) -> None:
+        """changestream 모드: post_events 삽입을 받아 이 워커의 구독자에게 분배."""
+        resume = None
+        while True:
+            try:
+                async with event_log.watch([{"$match": {"operationType": "insert"}}], resume_after=resume) as stream:
+                    async for change in stream:
+                        resume = stream.resume_token
+                        d = change["fullDocument"]
+                        if d["kind"] == "post_deleted":
+                            post_cache.invalidate(d["post_id"])     # 다른 워커가 지운 글: 새 구독/댓글 조회도 바로 404
+                        self.publish(d["post_id"], d["kind"], d["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[SSE] change stream failed: {e!r}")
+                await asyncio.sleep(1)
+
+event_hub = EventHub()
+
+async def emit_post_event(oid: ObjectId, kind: str, data: dict) -> None:
+    if SSE_SOURCE == "changestream":
+        await event_log.insert_one({"post_id": oid, "kind": kind, "data": data, "created_at": datetime.now(timezone.utc)})
+    else:
+        event_hub.publish(oid, kind, data)
 
 
 # =========================
 # 인증 도우미
 # =========================
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))  # 워커 간 불일치 허용 시간
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "10000"))
+
+token_cache = TTLCache(USER_CACHE_MAX, USER_CACHE_TTL_SECONDS)      # access token → uid (디코드 결과)
+principal_cache = TTLCache(USER_CACHE_MAX, USER_CACHE_TTL_SECONDS)  # uid → 사용자 요약
+
+# 인증된 요청 처리에 필요한 필드만 캐시한다(비밀번호 해시 등은 제외)
+PRINCIPAL_FIELDS = {"_id": 1, "email": 1, "username": 1, "token_version": 1, "email_verified": 1}
+
+def invalidate_principal(uid) -> None:
+    """사용자 문서를 바꾼 쪽에서 호출: 다음 요청은 DB에서 다시 읽음."""
+    principal_cache.pop(str(uid))
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """
-    Authorization: Bearer <JWT> 를 파싱해 현재 사용자 문서를 반환.
+    Authorization: Bearer <JWT> 를 파싱해 현재 사용자(요약) 문서를 반환.
+    - 디코드된 토큰과 사용자 요약은 짧은 TTL 로 캐시 → 요청마다 users 조회를 하지 않음
     """
     credentials_exc = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])  # 토큰 검증 및 디코드
-        uid: str = payload.get("sub")                                    # subject(사용자 ID) 추출
-        if not uid:
+    uid = token_cache.get(token)
+    if uid is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])  # 토큰 검증 및 디코드
+            uid = payload.get("sub")                                         # subject(사용자 ID) 추출
+            if not uid:
+                raise credentials_exc
+        except JWTError:
             raise credentials_exc
-    except JWTError:
-        raise credentials_exc
-
-    doc = await users.find_one({"_id": ObjectId(uid)})                   # DB에서 사용자 문서 조회
-    if not doc:
-        raise credentials_exc
+        # 토큰 만료 시각을 넘겨 캐시하지 않음
+        remaining = float(payload.get("exp", 0)) - time.time()
+        token_cache.set(token, uid, ttl=min(USER_CACHE_TTL_SECONDS, remaining))
+
+    doc = principal_cache.get(uid)
+    if doc is None:
+        doc = await users.find_one({"_id": ObjectId(uid)}, PRINCIPAL_FIELDS)  # DB에서 사용자 문서 조회
+        if not doc:
+            raise credentials_exc
+        principal_cache.set(uid, doc)
     return doc
 
 
+async def get_optional_user(token: Optional[str] = Depends(oauth2_optional)) -> Optional[dict]:
+    """토큰이 없거나 유효하지 않으면 None (공개 API용)."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
+
+
 # =========================
 # 헬스체크
 # =========================
@@ -282,6 +2055,44 @@ async def health():
     await posts.estimated_document_count()
     return {"ok": True}
 
+def metrics_allowed(request: Request) -> bool:
+    if METRICS_TOKEN:
+        auth = request.headers.get("authorization", "")
+        return hmac.compare_digest(auth.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    try:
+        addr = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Prometheus 스크레이프용. 이 워커는 현재 값, 다른 워커는 마지막 스냅샷."""
+    if not metrics_allowed(request):
+        raise HTTPException(404, "Not Found")      # 공개 쪽에는 존재 자체를 드러내지 않음
+    snapshots = [(WORKER_ID, metrics.samples())]
+    if METRICS_SHARE:
+        since = datetime.now(timezone.utc) - timedelta(seconds=METRICS_STALE_SECONDS)
+        async for d in metrics_snapshots.find({"_id": {"$ne": WORKER_ID}, "updated_at": {"$gt": since}}):
+            snapshots.append((d["_id"], d["samples"]))
+    return Response(render_metrics(snapshots), media_type="text/plain; version=0.0.4")
+
+
+async def find_user(email: str, raw_email: str, username: Optional[str] = None, projection=None) -> Optional[dict]:
+    """
+    정규화 이메일 → 원본 이메일 → username 우선순위로 사용자 1명을 고른다.
+    (예전처럼 find_one 을 여러 번 순서대로 부르지 않고 $or 조회 한 번)
+    """
+    conds = [{"email": {"$in": list(dict.fromkeys([email, raw_email]))}}]
+    if username:
+        conds.append({"username": username})
+    docs = await users.find({"$or": conds}, projection).to_list(3)
+    for field, value in (("email", email), ("email", raw_email), ("username", username)):
+        for d in docs:
+            if value is not None and d.get(field) == value:
+                return d
+    return None
+
 
 # =========================
 # 인증 API
@@ -291,32 +2102,38 @@ async def signup(u: UserCreate):
     # 중복 검사
     raw_email = str(u.email)
     email = normalize_email(raw_email)
-    if await users.find_one({"email": email}) or await users.find_one({"email": raw_email}):
-        raise HTTPException(400, "email already in use")
-    if await users.find_one({"username": u.username}):
+    dup = await find_user(email, raw_email, u.username, {"email": 1, "username": 1})
+    if dup:
+        if dup.get("email") in (email, raw_email):
+            raise HTTPException(400, "email already in use")
         raise HTTPException(400, "username already in use")
 
     # 사용자 저장(해시 비밀번호)
     doc = {
         "email": email,
         "username": u.username,
-        "password_hash": hash_password(u.password),
+        "password_hash": await hasher.hash(u.password),
         "created_at": datetime.now(timezone.utc),
         "token_version": 0,
         "email_verified": False,                               # 이메일 검증
     }
-    res = await users.insert_one(doc)
-    saved = await users.find_one({"_id": res.inserted_id})
+    try:
+        await users.insert_one(doc)
+    except DuplicateKeyError as e:       # 중복 검사와 저장 사이에 누가 먼저 가입한 경우
+        key = (e.details or {}).get("keyPattern") or {}
+        field = "username" if "username" in key else "email"
+        raise HTTPException(400, f"{field} already in use")
+    # 사용자가 실제로 저장된 뒤에만 토큰 발급(가입 실패 시 고아 토큰이 남지 않게)
     tok = gen_verify_token()
     await veri_tokens.insert_one({
         "email": email,
-        "token_hash": hash_password(tok),
+        "token_digest": secret_digest("verify", email, tok),
         "expires_at": datetime.now(timezone.utc) + timedelta(hours=VERIFY_TTL_HOURS),
         "used": False,
         "created_at": datetime.now(timezone.utc),
     })
-    await send_verify_link(email, tok)
-    return user_to_out(saved)
+    await queue_verify_link(email, tok)
+    return user_to_out(doc)                # insert_one 이 doc["_id"] 를 채워 줌
 
 
 # [ADD] 메일 인증 토큰 유틸
@@ -328,10 +2145,13 @@ def gen_verify_token() -> str:
 # 실무에선 .env 등으로 분리 권장
 BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://localhost:8000")
 
-async def send_verify_link(email: str, token: str) -> None:
+async def queue_verify_link(email: str, token: str) -> None:
     # 걍 클릭시 인증되게 설정
     link = f"{BACKEND_ORIGIN}/auth/verify-email?email={email}&token={token}"
-    print(f"[MAIL] verify link to={email} url={link}")
+    await mailer.enqueue(
+        email, "이메일 인증", f"아래 링크를 눌러 이메일 인증을 완료해 주세요.\n{link}",
+        timedelta(hours=VERIFY_TTL_HOURS),
+    )
 
 class ResendBody(BaseModel):
     email: EmailStr
@@ -341,7 +2161,7 @@ async def resend_verify(body: ResendBody, request: Request):
     # [ADD] 레이트리밋(선택)
     client_ip = request.client.host if request.client else "?"
     email = normalize_email(str(body.email))
-    if not rate_limit(f"vresend:{client_ip}:{email}", 3, 600):
+    if not await rate_limit(f"vresend:{client_ip}:{email}", 3, 600):
         raise HTTPException(429, "too many requests")
 
     user = await users.find_one({"email": email})
@@ -354,31 +2174,41 @@ async def resend_verify(body: ResendBody, request: Request):
     tok = gen_verify_token()
     await veri_tokens.insert_one({
         "email": email,
-        "token_hash": hash_password(tok),
+        "token_digest": secret_digest("verify", email, tok),
         "expires_at": datetime.now(timezone.utc) + timedelta(hours=VERIFY_TTL_HOURS),
         "used": False,
         "created_at": datetime.now(timezone.utc),
     })
-    await send_verify_link(email, tok)
+    await queue_verify_link(email, tok)
     return {"ok": True}
 
 @app.get("/auth/verify-email")
 async def verify_email(email: EmailStr, token: str, response: Response):
     email_norm = normalize_email(str(email))
 
-    rec = await veri_tokens.find_one({
-        "email": email_norm,
-        "used": False,
-        "expires_at": {"$gt": datetime.now(timezone.utc)},
-    }, sort=[("_id", -1)])
+    live = {"email": email_norm, "used": False, "expires_at": {"$gt": datetime.now(timezone.utc)}}
 
-    if not rec or not verify_password(token, rec["token_hash"]):
+    # 다이제스트 인덱스로 바로 찾아 사용 처리(+시도 횟수)까지 한 번에
+    rec = await veri_tokens.find_one_and_update(
+        {**live, "token_digest": secret_digest("verify", email_norm, token)},
+        {"$set": {"used": True}, "$inc": {"attempts": 1}},
+    )
+    if not rec and LEGACY_BCRYPT_SECRETS:
+        legacy = await veri_tokens.find_one({**live, "token_hash": {"$exists": True}}, sort=[("_id", -1)])
+        if legacy and await hasher.verify(token, legacy["token_hash"]):
+            await veri_tokens.update_one({"_id": legacy["_id"]}, {"$set": {"used": True}})
+            rec = legacy
+
+    if not rec:
         # 통일된 실패 화면용 응답 (프론트에서 "유효하지 않거나 만료됨" 안내)
         raise HTTPException(400, "invalid or expired token")
 
-    # 사용 처리 + 사용자 플래그 업데이트
-    await veri_tokens.update_one({"_id": rec["_id"]}, {"$set": {"used": True}})
-    await users.update_one({"email": email_norm}, {"$set": {"email_verified": True}})
+    # 사용자 플래그 업데이트
+    verified = await users.find_one_and_update(
+        {"email": email_norm}, {"$set": {"email_verified": True}}, projection={"_id": 1},
+    )
+    if verified:
+        invalidate_principal(verified["_id"])
 
     # (선택) 성공 페이지 리다이렉트
     return {"ok": True}
@@ -389,32 +2219,30 @@ class StartBody(BaseModel):
 
 @app.post("/auth/start")
 async def start_auth(body: StartBody, request: Request):
-    t0 = perf_counter()
-    client_ip = request.client.host if request.client else "?"
-    raw_email = str(body.email)
-    email = normalize_email(raw_email)
-
-    if not rate_limit(f"start:{client_ip}", 10, 60) or not rate_limit(f"start:{client_ip}:{email}", 5, 300):
-        delay_floor(t0)
-        raise HTTPException(status_code=429, detail="too many requests")
+    async with timing_floor():
+        client_ip = request.client.host if request.client else "?"
+        raw_email = str(body.email)
+        email = normalize_email(raw_email)
+
+        if not await rate_limit(f"start:{client_ip}", 10, 60) or not await rate_limit(f"start:{client_ip}:{email}", 5, 300):
+            raise HTTPException(status_code=429, detail="too many requests")
+
+        user = await find_user(email, raw_email, projection={"_id": 1})
+        if user:
+            await verifs.delete_many({"email": email, "used": False})
+            code = gen_code()
+            await verifs.insert_one({
+                "email": email,
+                "code_digest": secret_digest("code", email, code),
+                "expires_at": datetime.now(timezone.utc) + timedelta(minutes=CODE_TTL_MINUTES),
+                "attempts": 0,
+                "created_ip": client_ip,
+                "used": False,
+                "created_at": datetime.now(timezone.utc),
+            })
+            await queue_email_code(email, code)
 
-    user = await users.find_one({"email": email}) or await users.find_one({"email": raw_email})
-    if user:
-        await verifs.delete_many({"email": email, "used": False})
-        code = gen_code()
-        await verifs.insert_one({
-            "email": email,
-            "code_hash": hash_password(code),
-            "expires_at": datetime.now(timezone.utc) + timedelta(minutes=CODE_TTL_MINUTES),
-            "attempts": 0,
-            "created_ip": client_ip,
-            "used": False,
-            "created_at": datetime.now(timezone.utc),
-        })
-        await send_email_code(email, code)
-
-    delay_floor(t0)
-    return {"ok": True}
+        return {"ok": True}
 
 class VerifyBody(BaseModel):
     email: EmailStr
@@ -422,52 +2250,52 @@ class VerifyBody(BaseModel):
 
 @app.post("/auth/verify")
 async def verify_code(body: VerifyBody, request: Request, response: Response):
-    t0 = perf_counter()
-    client_ip = request.client.host if request.client else "?"
-    raw_email = str(body.email)
-    email = normalize_email(raw_email)
-    code = body.code.strip()
-    if not code.isdigit():
-        delay_floor(t0)
-        raise HTTPException(status_code=400, detail="invalid or expired code")
-
-    if not rate_limit(f"verify:{client_ip}", 20, 60) or not rate_limit(f"verify:{client_ip}:{email}", 10, 300):
-        delay_floor(t0)
-        raise HTTPException(status_code=429, detail="too many requests")
-
-    rec = await verifs.find_one({
-        "email": email,
-        "used": False,
-        "expires_at": {"$gt": datetime.now(timezone.utc)},
-    }, sort=[("_id", -1)])
-
-    ok = False
-    if rec:
-        attempts = rec.get("attempts", 0)
-        if attempts >= MAX_CODE_ATTEMPTS:
-            ok = False
-        else:
-            ok = verify_password(code, rec["code_hash"])
-            await verifs.update_one({"_id": rec["_id"]}, {"$inc": {"attempts": 1}})
-
-    if not ok:
-        delay_floor(t0)
-        raise HTTPException(status_code=400, detail="invalid or expired code")
-
-    await verifs.update_one({"_id": rec["_id"]}, {"$set": {"used": True}})
-
-    epp_token = create_epp(email)
-    response.set_cookie(
-        key=EPP_COOKIE_NAME,
-        value=epp_token,
-        httponly=True,
-        secure=False,  # set True behind HTTPS
-        samesite="strict",
-        path="/",
-        max_age=EPP_TTL_MINUTES * 60,
-    )
-    delay_floor(t0)
-    return {"ok": True}
+    async with timing_floor():
+        client_ip = request.client.host if request.client else "?"
+        raw_email = str(body.email)
+        email = normalize_email(raw_email)
+        code = body.code.strip()
+        if not code.isdigit():
+            raise HTTPException(status_code=400, detail="invalid or expired code")
+
+        if not await rate_limit(f"verify:{client_ip}", 20, 60) or not await rate_limit(f"verify:{client_ip}:{email}", 10, 300):
+            raise HTTPException(status_code=429, detail="too many requests")
+
+        live = {
+            "email": email,
+            "used": False,
+            "expires_at": {"$gt": datetime.now(timezone.utc)},
+            "attempts": {"$lt": MAX_CODE_ATTEMPTS},
+        }
+
+        # 1) 맞는 코드: 다이제스트 인덱스로 찾아 사용 처리 + 시도 횟수 증가를 한 번에
+        rec = await verifs.find_one_and_update(
+            {**live, "code_digest": secret_digest("code", email, code)},
+            {"$set": {"used": True}, "$inc": {"attempts": 1}},
+        )
+        ok = rec is not None
+        if not ok:
+            # 2) 틀린 코드: 최신 레코드의 시도 횟수만 증가 (레거시 bcrypt 레코드면 여기서 검증)
+            cur = await verifs.find_one_and_update(live, {"$inc": {"attempts": 1}}, sort=[("_id", -1)])
+            if cur and LEGACY_BCRYPT_SECRETS and "code_hash" in cur:
+                ok = await hasher.verify(code, cur["code_hash"])
+                if ok:
+                    await verifs.update_one({"_id": cur["_id"]}, {"$set": {"used": True}})
+
+        if not ok:
+            raise HTTPException(status_code=400, detail="invalid or expired code")
+
+        epp_token = create_epp(email)
+        response.set_cookie(
+            key=EPP_COOKIE_NAME,
+            value=epp_token,
+            httponly=True,
+            secure=False,  # set True behind HTTPS
+            samesite="strict",
+            path="/",
+            max_age=EPP_TTL_MINUTES * 60,
+        )
+        return {"ok": True}
 
 class LoginBody(BaseModel):                                        # JSON 로그인 바디(프론트용)
     email: EmailStr
@@ -475,62 +2303,57 @@ class LoginBody(BaseModel):                                        # JSON 로그
 
 @app.post("/auth/login", response_model=TokenOut)
 async def login(body: LoginBody, response: Response):
-    t0 = perf_counter()
-    raw_email = str(body.email)
-    email = normalize_email(raw_email)
-
-    # 1) 사용자 조회 (정규화/원본 둘 다)
-    user = await users.find_one({"email": email}) or await users.find_one({"email": raw_email})
-
-    # 2) 비밀번호 검증 (더미 해시로 타이밍 보호)
-    valid = verify_with_dummy(body.password, user["password_hash"] if user else None)
-
-    # 3) 자격증명 자체가 틀린 경우 → 401 (정보은닉)
-    if not (user and valid):
-        delay_floor(t0)
-        raise HTTPException(
-            status_code=401,
-            detail={"code": "INVALID_CREDENTIALS", "message": "이메일 또는 비밀번호가 올바르지 않습니다."}
+    async with timing_floor():
+        raw_email = str(body.email)
+        email = normalize_email(raw_email)
+
+        # 1) 사용자 조회 (정규화/원본 둘 다)
+        user = await find_user(email, raw_email)
+
+        # 2) 비밀번호 검증 (더미 해시로 타이밍 보호)
+        valid = await hasher.verify_with_dummy(body.password, user["password_hash"] if user else None)
+
+        # 3) 자격증명 자체가 틀린 경우 → 401 (정보은닉)
+        if not (user and valid):
+            raise HTTPException(
+                status_code=401,
+                detail={"code": "INVALID_CREDENTIALS", "message": "이메일 또는 비밀번호가 올바르지 않습니다."}
+            )
+
+        # 4) 자격증명은 맞지만 이메일 미인증 → 403 명시
+        if not user.get("email_verified", False):
+            raise HTTPException(
+                status_code=403,
+                detail={"code": "EMAIL_NOT_VERIFIED", "message": "이메일 인증이 필요합니다. 메일함의 인증 링크를 확인해 주세요."}
+            )
+
+        # 5) 정상 발급
+        issued_at = datetime.now(timezone.utc)
+        access = create_access_token({"sub": str(user["_id"]), "iat": issued_at})
+        refresh = create_refresh_token({"sub": str(user["_id"]), "ver": user.get("token_version", 0), "iat": issued_at})
+
+        response.set_cookie(
+            key="refresh_token",
+            value=refresh,
+            httponly=True,
+            secure=False,        # 배포시 True
+            path="/",
+            samesite="lax",
+            max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
         )
-
-    # 4) 자격증명은 맞지만 이메일 미인증 → 403 명시
-    if not user.get("email_verified", False):
-        delay_floor(t0)
-        raise HTTPException(
-            status_code=403,
-            detail={"code": "EMAIL_NOT_VERIFIED", "message": "이메일 인증이 필요합니다. 메일함의 인증 링크를 확인해 주세요."}
-        )
-
-    # 5) 정상 발급
-    issued_at = datetime.now(timezone.utc)
-    access = create_access_token({"sub": str(user["_id"]), "iat": issued_at})
-    refresh = create_refresh_token({"sub": str(user["_id"]), "ver": user.get("token_version", 0), "iat": issued_at})
-
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh,
-        httponly=True,
-        secure=False,        # 배포시 True
-        path="/",
-        samesite="lax",
-        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-    )
-    delay_floor(t0)
-    return TokenOut(access_token=access, user=user_to_out(user))
+        return TokenOut(access_token=access, user=user_to_out(user))
 
 
 @app.post("/auth/token", response_model=TokenOut)                  # Swagger Authorize
 async def issue_token(form: OAuth2PasswordRequestForm = Depends()):
     # 필드에 이메일 또는 username 둘 다 허용
     identifier = form.username
-    user = None
     if "@" in identifier:
-        email_norm = normalize_email(identifier)
-        user = await users.find_one({"email": email_norm}) or await users.find_one({"email": identifier})
-    if not user:
+        user = await find_user(normalize_email(identifier), identifier, identifier)
+    else:
         user = await users.find_one({"username": identifier})
 
-    valid = verify_with_dummy(form.password, user["password_hash"] if user else None)
+    valid = await hasher.verify_with_dummy(form.password, user["password_hash"] if user else None)
     if not (user and valid):
         raise HTTPException(status_code=401, detail="invalid email/username or password")
 
@@ -580,6 +2403,7 @@ async def refresh_token(request: Request, response: Response):
 async def logout(response: Response, current=Depends(get_current_user)):
     # token_version 증가 -> 이전 refresh 무효화
     await users.update_one({"_id": current["_id"]}, {"$inc": {"token_version": 1}})
+    invalidate_principal(current["_id"])
 
     # 쿠키 제거
     response.delete_cookie("refresh_token", path="/")
@@ -589,53 +2413,310 @@ async def logout(response: Response, current=Depends(get_current_user)):
 async def me(current=Depends(get_current_user)):
     return user_to_out(current)
 
+@app.patch("/auth/me", response_model=UserOut)                     # 내 정보 수정(아이디)
+async def update_me(body: UserUpdate, current=Depends(get_current_user)):
+    if body.username == current["username"]:
+        return user_to_out(current)
+    try:
+        doc = await users.find_one_and_update(
+            {"_id": current["_id"]},
+            {"$set": {"username": body.username, "username_sync_pending": True}},
+            projection=PRINCIPAL_FIELDS,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(400, "username already in use")
+    if not doc:
+        raise HTTPException(401, "Invalid credentials")
+    invalidate_principal(current["_id"])
+    # 글/댓글의 author_username 은 응답 후 배치로 갱신
+    start_background(sync_author_username(current["_id"]))
+    return user_to_out(doc)
+
+@app.get("/users/{uid}/posts", response_model=List[PostSummary])   # 작성자별 글 목록(공개)
+async def list_user_posts(
+    uid: str,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+):
+    """
+    해당 사용자의 글 최신순(요약). (author_id, _id desc) 인덱스로 커서 페이지네이션.
+    """
+    query = {"author_id": uid, **NOT_DELETED}
+    if before:
+        query["_id"] = {"$lt": decode_cursor(before)}
+    cursor = posts.find(query, POST_SUMMARY_PROJECTION).sort("_id", -1).limit(limit + 1)
+    docs = [d async for d in cursor]
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1]["_id"])
+    if FAST_JSON:
+        return fast_json([{**post_to_summary_dict(d), "liked": None} for d in docs], response)
+    return [post_to_summary(d) for d in docs]
+
 # =========================
 # 게시글 API (목록/조회는 공개, 작성/수정/삭제는 로그인 필요)
 # =========================
-@app.get("/posts", response_model=List[PostOut])                   # 목록(공개)
-async def list_posts(skip: int = 0, limit: int = 20):
-    cursor = posts.find().skip(skip).limit(limit).sort("_id", -1)  # 최신순
-    return [post_to_out(d) async for d in cursor]
+MAX_LIKED_BATCH = 100  # GET /posts/liked 한 번에 물어볼 수 있는 글 수
+
+async def liked_post_ids(uid: str, oids: List[ObjectId]) -> set:
+    """oids 중 uid 가 좋아요 한 글의 ObjectId 집합 (post_likes 인덱스 조회 한 번 + 레거시 배열)."""
+    if not oids:
+        return set()
+    rows, legacy = await asyncio.gather(
+        post_likes.find({"post_id": {"$in": oids}, "user_id": uid}, {"_id": 0, "post_id": 1}).to_list(None),
+        posts.find({"_id": {"$in": oids}, "likes": uid}, {"_id": 1}).to_list(None),
+    )
+    return {r["post_id"] for r in rows} | {d["_id"] for d in legacy}
+
+@app.get("/posts", response_model=List[Union[PostOut, PostSummary]], response_model_exclude_unset=True)  # 목록(공개)
+async def list_posts(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    include: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^(full|summary)$"),
+    with_total: bool = False,
+    sort: str = Query("new", pattern="^(new|hot)$"),
+    current: Optional[dict] = Depends(get_optional_user),
+):
+    """
+    최신순(기본) 또는 인기순(sort=hot) 목록.
+    - sort=hot: 미리 계산된 인기 순위에서 페이지를 잘라 옴. before 는 X-Next-Cursor 커서(skip 무시)
+    - before 가 있으면 커서 모드: _id < before 구간을 _id 인덱스로 바로 탐색(skip 무시)
+    - 없으면 기존 skip/limit 방식(현재 프론트 호환)
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더에 불투명 커서를 실어 보냄
+    - include=liked: 각 글에 내 좋아요 여부(liked)를 함께 채움(비로그인은 false)
+    - fields=summary: body 대신 짧은 excerpt 만 프로젝션해서 보냄(PostSummary)
+    - with_total=true: 전체 글 수를 X-Total-Count 헤더로 함께 보냄(/posts/count 추가 요청 불필요)
+    - ETag/If-None-Match: 페이지 글들의 ver 만 먼저 읽어 같으면 304 (include=liked 는 사용자별이라 제외)
+    """
+    summary = fields == "summary"
+    includes = set((include or "").split(","))
+    personal = "liked" in includes
+    projection = POST_SUMMARY_PROJECTION if summary else POST_HEAVY_FIELDS
+    next_cursor = None
+    if sort == "hot":
+        ids, next_cursor = await hot_feed.page(limit, before)
+
+        def load(proj):
+            return find_posts_in_order(ids, proj)
+    else:
+        query = dict(NOT_DELETED)
+        if before:
+            query["_id"] = {"$lt": decode_cursor(before)}
+            skip = 0
+
+        def load(proj):
+            # limit+1 개를 읽어 다음 페이지 존재 여부를 추가 쿼리 없이 판단
+            return posts.find(query, proj).sort("_id", -1).skip(skip).limit(limit + 1).to_list(None)  # 최신순
+    total = await get_post_total() if with_total else None
+    seed = ("posts", sort, fields, skip, limit, before, total)
+    if not personal and request.headers.get("if-none-match"):
+        etag = docs_etag(seed, await load({"ver": 1}))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    docs = await load(projection)
+    if not personal:
+        response.headers["ETag"] = docs_etag(seed, docs)
+    if with_total:
+        response.headers["X-Total-Count"] = str(total)
+    if sort != "hot" and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["_id"])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    liked = None
+    if personal:
+        liked = await liked_post_ids(str(current["_id"]), [d["_id"] for d in docs]) if current else set()
+    if FAST_JSON:
+        # response_model_exclude_unset 과 같게: liked 는 요청했을 때만 넣음
+        to_dict = post_to_summary_dict if summary else post_to_dict
+        rows = [to_dict(d) for d in docs]
+        if liked is not None:
+            for row, d in zip(rows, docs):
+                row["liked"] = d["_id"] in liked
+        return fast_json(rows, response)
+    items = [post_to_summary(d) if summary else post_to_out(d) for d in docs]
+    if liked is not None:
+        for item, d in zip(items, docs):
+            item.liked = d["_id"] in liked
+    return items
 
 @app.post("/posts", response_model=PostOut, status_code=201)       # 생성(로그인 필요)
 async def create_post(p: PostIn, current=Depends(get_current_user)):
     doc = {
         **p.dict(),
+        "excerpt": make_excerpt(p.body),        # 목록 요약용 발췌
         "author_id": str(current["_id"]),       # ← 필수
         "author_username": current["username"], # (옵션) 목록/상세에 닉 표시용
         "created_at": datetime.now(timezone.utc),
         "comments_count": 0,
-        "likes": [],
+        "likes_count": 0,                       # 좋아요 목록은 post_likes 컬렉션에 저장
+        "ver": 1,                               # 내용/카운터가 바뀔 때마다 +1 (ETag)
+        **search_fields(p.title, p.body),
     }
-    res = await posts.insert_one(doc)
-    doc = await posts.find_one({"_id": res.inserted_id})
+    async with mongo_transaction() as session:
+        await posts.insert_one(doc, session=session)   # doc["_id"] 채워짐 → 다시 읽지 않음
+        await bump_post_total(1, session=session)
+    total_cache.pop("posts")
+    hot_feed.add(doc["_id"])
     return post_to_out(doc)
 
+@app.get("/posts/search", response_model=List[PostSummary])        # 검색(공개)
+async def search_posts(
+    response: Response,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """
+    제목/본문 검색. 관련도(score) 내림차순, 같은 점수는 최신순.
+    - 텍스트 인덱스($text) 또는 SEARCH_NGRAM=1 이면 2-gram 인덱스
+    - 다음 페이지는 X-Next-Cursor 헤더의 커서를 cursor= 로
+    """
+    if SEARCH_NGRAM:
+        grams = [g for g in make_grams(q) if len(g) > 1] or make_grams(q)
+        if not grams:
+            return []
+        match = {"search_grams": {"$all": grams}}
+        # 제목에 걸린 gram 비율로 가중
+        score = {"$add": [1, {"$multiply": [
+            SEARCH_TITLE_WEIGHT,
+            {"$divide": [{"$size": {"$setIntersection": [{"$ifNull": ["$title_grams", []]}, grams]}}, len(grams)]},
+        ]}]}
+    else:
+        match = {"$text": {"$search": q}}
+        score = {"$meta": "textScore"}
+
+    pipeline = [
+        {"$match": {**match, **NOT_DELETED}},
+        {"$addFields": {"score": score}},
+    ]
+    if cursor:
+        last_score, last_id = decode_search_cursor(cursor)
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": last_score}},
+            {"score": last_score, "_id": {"$lt": last_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {**POST_SUMMARY_PROJECTION, "score": 1}},
+    ]
+    docs = await posts.aggregate(pipeline).to_list(None)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_search_cursor(docs[-1]["score"], docs[-1]["_id"])
+    if FAST_JSON:
+        return fast_json([{**post_to_summary_dict(d), "liked": None} for d in docs], response)
+    return [post_to_summary(d) for d in docs]
+
 @app.get("/posts/count")
 async def posts_cout():
-    try:
-        total = await posts.count_documents({})
-    except Exception:
-        total = await posts.estimated_document_count()
-    return {"total": int(total)}
+    return {"total": await get_post_total()}
+
+@app.get("/posts/liked")                                           # 여러 글 좋아요 여부(한 번에)
+async def liked_batch(ids: str, current=Depends(get_current_user)):
+    """
+    ?ids=a,b,c → {"a": true, "b": false, ...}
+    목록 화면이 글마다 /posts/{pid}/liked 를 부르지 않도록 한 번에 답함.
+    """
+    pids = [x for x in dict.fromkeys(i.strip() for i in ids.split(",")) if x]
+    if len(pids) > MAX_LIKED_BATCH:
+        raise HTTPException(400, f"too many ids (max {MAX_LIKED_BATCH})")
+    if not all(ObjectId.is_valid(x) for x in pids):
+        raise HTTPException(400, "invalid id")
+    liked = await liked_post_ids(str(current["_id"]), [ObjectId(x) for x in pids])
+    return {x: ObjectId(x) in liked for x in pids}
 
 @app.get("/posts/{pid}", response_model=PostOut)                   # 단건 조회(공개)
-async def get_post(pid: str):
-    doc = await posts.find_one({"_id": ObjectId(pid)})
+async def get_post(pid: str, request: Request, response: Response):
+    oid = ObjectId(pid)
+    doc = await post_cache.get(oid)
     if not doc:
         raise HTTPException(404, "not found")
+    etag = make_etag("post", oid, doc.get("ver", 0))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if FAST_JSON:
+        return fast_json({**post_to_dict(doc), "liked": None}, response)
     return post_to_out(doc)
 
+@app.get("/posts/{pid}/detail", response_model=PostDetailOut)      # 상세 화면 묶음(공개)
+async def get_post_detail(
+    pid: str,
+    limit: int = Query(100, ge=1, le=100),
+    current: Optional[dict] = Depends(get_optional_user),
+):
+    """
+    상세 화면이 보내던 4개 요청(글/댓글/liked/me)을 한 번에.
+    - 글 + 첫 댓글 페이지: $lookup 집계 1회
+    - 내 좋아요: post_likes 점조회 1회(집계와 동시에)
+    - viewer: 인증 캐시에서
+    """
+    oid = ObjectId(pid)
+    uid = str(current["_id"]) if current else None
+    pipeline = [
+        {"$match": {"_id": oid, **NOT_DELETED}},
+        # 레거시 likes 배열은 내 포함 여부만 계산하고 버림
+        {"$addFields": {"legacy_liked": {"$in": [uid, {"$ifNull": ["$likes", []]}]}}},
+        {"$project": POST_HEAVY_FIELDS},
+        {"$lookup": {
+            "from": comments.name,
+            "localField": "_id",
+            "foreignField": "post_id",
+            "pipeline": [{"$sort": {"created_at": 1, "_id": 1}}, {"$limit": limit + 1}],
+            "as": "comments",
+        }},
+    ]
+    agg = posts.aggregate(pipeline).to_list(1)
+    if uid:
+        found, row = await asyncio.gather(agg, post_likes.find_one({"post_id": oid, "user_id": uid}, {"_id": 1}))
+    else:
+        found, row = await agg, None
+    if not found:
+        raise HTTPException(404, "not found")
+    doc = found[0]
+    cms = doc.pop("comments")
+    next_cursor = None
+    if len(cms) > limit:
+        cms = cms[:limit]
+        next_cursor = encode_comment_cursor(cms[-1])
+    liked = bool(uid) and (row is not None or doc.get("legacy_liked", False))
+    if FAST_JSON:
+        return fast_json({
+            "post": {**post_to_dict(doc), "liked": None},
+            "comments": [comment_to_dict(c) for c in cms],
+            "next_cursor": next_cursor,
+            "liked": liked,
+            "viewer": user_to_dict(current) if current else None,
+        })
+    return PostDetailOut(
+        post=post_to_out(doc),
+        comments=[comment_to_out(c) for c in cms],
+        next_cursor=next_cursor,
+        liked=liked,
+        viewer=user_to_out(current) if current else None,
+    )
+
 @app.put("/posts/{pid}", response_model=PostOut)                   # 수정(로그인 필요)
 async def update_post(pid: str, p: PostIn, current=Depends(get_current_user)):
     oid = ObjectId(pid)
     upd = await posts.find_one_and_update(
-        {"_id": oid, "author_id": str(current["_id"])},
-        {"$set": p.dict()},
+        {"_id": oid, "author_id": str(current["_id"]), **NOT_DELETED},
+        {"$set": {**p.dict(), "excerpt": make_excerpt(p.body), **search_fields(p.title, p.body)},
+         "$inc": {"ver": 1}},
+        projection=POST_HEAVY_FIELDS,
         return_document=True,
         )
     if not upd:
         raise HTTPException(404, "not found")
+    post_cache.invalidate(oid)
     return post_to_out(upd)
 
 @app.delete("/posts/{pid}", status_code=204)                       # 삭제(로그인 필요)
@@ -643,80 +2724,196 @@ async def delete_post(pid: str, current=Depends(get_current_user)):
     """
     - 경로 파라미터 pid는 문자열로 받지만, Mongo 조회 시 ObjectId로 변환
     - Depends(get_current_user): 요청 헤더의 Bearer 토큰 검증 → 현재 사용자 문서 반환
-    - 본인 글인지 검사 후 삭제
+    - 본인 글인지 검사 후 소프트 삭제(즉시 목록/조회에서 사라짐)
+    - 댓글/좋아요/글 문서 실제 삭제는 purge_worker 가 배치로 처리
     """
     oid = ObjectId(pid)
-    doc = await posts.find_one({"_id": oid})
+    uid = str(current["_id"])
+    async with mongo_transaction() as session:
+        # 본인 글 조건까지 걸어 한 번에 삭제 표시
+        doc = await posts.find_one_and_update(
+            {"_id": oid, "author_id": uid, **NOT_DELETED},
+            {"$set": {"deleted_at": datetime.now(timezone.utc)}},
+            projection={"_id": 1},
+            session=session,
+        )
+        if doc:
+            await bump_post_total(-1, session=session)
+            await enqueue_purge(oid, uid, session=session)
     if not doc:
+        # 실패 원인 구분(드문 경로)
+        if await posts.find_one({"_id": oid, **NOT_DELETED}, {"_id": 1}):
+            raise HTTPException(403, "not owner")
         raise HTTPException(404, "not found")
-    if str(doc.get("author_id")) != str(current["_id"]):
-        raise HTTPException(403, "not owner")
-    await comments.delete_many({"post_id": oid})
-    await posts.delete_one({"_id": oid})
+    total_cache.pop("posts")
+    post_cache.invalidate(oid)
+    hot_feed.remove(oid)
+    purge_wakeup.set()
+    await emit_post_event(oid, "post_deleted", {})      # 열려 있는 SSE 구독 종료
+
+@app.get("/posts/{pid}/deletion")                                  # 삭제 정리 진행 상황(작성자)
+async def post_deletion_status(pid: str, current=Depends(get_current_user)):
+    job = await purge_jobs.find_one({"_id": ObjectId(pid), "author_id": str(current["_id"])})
+    if not job:
+        raise HTTPException(404, "not found")
+    return {
+        "status": job["status"],
+        "comments_deleted": job.get("comments_deleted", 0),
+        "likes_deleted": job.get("likes_deleted", 0),
+        "created_at": job["created_at"],
+        "finished_at": job.get("finished_at"),
+    }
 
 # --- 좋아요 추가 ---
 @app.post("/posts/{pid}/likes", status_code=204)
 async def like_post(pid: str, current=Depends(get_current_user)):
     """
-    내 사용자 ID를 해당 글의 likes 배열에 추가합니다(중복 없음).
+    post_likes 에 (글, 나) 문서를 upsert 합니다(중복 없음, 멱등).
     """
     oid = ObjectId(pid)
-    # 문서가 있는지 확인
-    post = await posts.find_one({"_id": oid}, {"_id": 1})
-    if not post:
+    uid = str(current["_id"])
+    if counter_agg and not await post_cache.get(oid):
         raise HTTPException(404, "post not found")
-    
-    # 캐시 필드 likes_count를 쓰고 싶다면 함께 유지보수:
-    res = await posts.update_one(
-        {"_id": oid},
-        {"$addToSet": {"likes": str(current["_id"])}}
-    )
-    if res.modified_count:
-        await posts.update_one({"_id": oid}, {"$inc": {"likes_count": 1}})
+    try:
+        res = await post_likes.update_one(
+            {"post_id": oid, "user_id": uid},
+            {"$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:      # 동시에 같은 좋아요 → 이미 반영됨
+        return
+    if res.upserted_id is None:    # 이미 좋아요 상태(멱등)
+        return
+    if counter_agg:
+        counter_agg.add(oid, "likes_count", 1)      # 존재 확인은 위에서 끝남
+    else:
+        # 이전 전 레거시 likes 배열에 이미 있던 사용자는 카운트하지 않음
+        inc = await posts.update_one({"_id": oid, "likes": {"$ne": uid}, **NOT_DELETED}, {"$inc": {"likes_count": 1, "ver": 1}})
+        if not inc.matched_count:
+            if not await post_cache.get(oid):
+                # 글이 없음 → 방금 넣은 좋아요 되돌림
+                await post_likes.delete_one({"_id": res.upserted_id})
+                raise HTTPException(404, "post not found")
+            post_cache.invalidate(oid)
+            return                  # 레거시 배열에 이미 있던 사용자: likes_count 그대로 → 순위/이벤트도 없음
+        post_cache.invalidate(oid)
+    # 글이 있는 게 확인된 뒤에만 순위/구독자에 반영
+    hot_feed.bump(oid, likes=1)
+    await emit_post_event(oid, "likes", {"delta": 1})
 
 # 좋아요 취소
 @app.delete("/posts/{pid}/likes", status_code=204)
 async def unlike_post(pid: str, current=Depends(get_current_user)):
     """
-    내 사용자 ID를 해당 글의 likes 배열에서 제거합니다.
+    post_likes 에서 (글, 나) 문서를 지웁니다(멱등).
     """
     oid = ObjectId(pid)
-    post = await posts.find_one({"_id": oid}, {"_id": 1})
-    if not post:
-        raise HTTPException(404, "post not found")
-
-    # likes_count 캐시를 쓰는 경우:
-    res = await posts.update_one(
-        {"_id": oid},
-        {"$pull": {"likes": str(current["_id"])}}
-    )
-    if res.modified_count:
-        await posts.update_one({"_id": oid}, {"$inc": {"likes_count": -1}})
+    uid = str(current["_id"])
+    res = await post_likes.delete_one({"post_id": oid, "user_id": uid})
+    if res.deleted_count:
+        hot_feed.bump(oid, likes=-1)
+        await emit_post_event(oid, "likes", {"delta": -1})
+    if res.deleted_count and counter_agg:
+        counter_agg.add(oid, "likes_count", -1)
+        return
+    if res.deleted_count:
+        # 레거시 likes 배열에도 남아 있을 수 있으니 함께 제거(이전이 끝난 글에서는 no-op)
+        await posts.update_one({"_id": oid}, {"$pull": {"likes": uid}, "$inc": {"likes_count": -1, "ver": 1}})
+    else:
+        # 아직 이전되지 않은 레거시 배열에만 있던 좋아요
+        legacy = await posts.update_one(
+            {"_id": oid, "likes": uid},
+            {"$pull": {"likes": uid}, "$inc": {"likes_count": -1, "ver": 1}},
+        )
+        if not legacy.modified_count:
+            if not await post_cache.get(oid):
+                raise HTTPException(404, "post not found")
+            return
+        hot_feed.bump(oid, likes=-1)
+        await emit_post_event(oid, "likes", {"delta": -1})
+    post_cache.invalidate(oid)
 
 # 현재 내가 좋아요 눌렀는지 여부
 @app.get("/posts/{pid}/liked")
 async def liked_by_me(pid: str, current=Depends(get_current_user)):
     """
     내가 이 글을 좋아요 했는지 true/false를 반환합니다.
+    (post_likes 유니크 인덱스 점조회 + 레거시 배열은 $elemMatch 로 해당 원소만 확인)
     """
     oid = ObjectId(pid)
-    doc = await posts.find_one({"_id": oid}, {"likes": 1})
+    uid = str(current["_id"])
+    row, doc = await asyncio.gather(
+        post_likes.find_one({"post_id": oid, "user_id": uid}, {"_id": 1}),
+        posts.find_one({"_id": oid, **NOT_DELETED}, {"likes": {"$elemMatch": {"$eq": uid}}}),
+    )
     if not doc:
         raise HTTPException(404, "post not found")
-    liked = str(current["_id"]) in doc.get("likes", [])
+    liked = row is not None or bool(doc.get("likes"))
     return {"liked": liked}
 
 @app.get("/posts/{pid}/comments", response_model=List[CommentOut]) # 댓글 목록
-async def list_comments(pid: str, skip: int = 0, limit: int = 20):
+async def list_comments(
+    pid: str,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    stream: bool = False,
+):
+    """
+    작성순 댓글 목록 (created_at, _id 오름차순).
+    - after: 커서 뒤 페이지, 더 있으면 X-Next-Cursor
+    - before: 커서 앞 페이지(역방향), 더 있으면 X-Prev-Cursor
+    - 커서를 쓰면 skip 무시
+    - stream=true: 커서 이후 전체를 NDJSON 으로 배치 단위 전송(limit 무시, 목록을 메모리에 쌓지 않음)
+    - ETag/If-None-Match: 페이지의 (id, ver) 만 먼저 읽어 같으면 304
+    """
     oid = ObjectId(pid)
-    cursor = comments.find({"post_id": oid}).skip(skip).limit(limit).sort("created_at", 1)
-    return [comment_to_out(d) async for d in cursor]
+    if not await post_cache.get(oid):       # 삭제 표시된 글의 댓글은 정리 전이라도 숨김
+        raise HTTPException(404, "post not found")
+    query = comments_range(oid, after, before)
+    asc = [("created_at", 1), ("_id", 1)]
+
+    if stream:
+        cursor = comments.find(query).sort(asc).batch_size(500)
+
+        async def lines():
+            async for d in cursor:
+                yield json.dumps(comment_to_json(d), ensure_ascii=False) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if after or before:
+        skip = 0
+    # 역방향: 커서 바로 앞 limit 개를 내림차순으로 읽고 다시 뒤집음
+    backward = bool(before and not after)
+
+    def load(proj):
+        if backward:
+            return comments.find(query, proj).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1).to_list(None)
+        return comments.find(query, proj).sort(asc).skip(skip).limit(limit + 1).to_list(None)
+
+    seed = ("comments", oid, skip, limit, after, before)
+    if request.headers.get("if-none-match"):
+        etag = docs_etag(seed, await load({"ver": 1}))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    docs = await load(None)
+    response.headers["ETag"] = docs_etag(seed, docs)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Prev-Cursor" if backward else "X-Next-Cursor"] = encode_comment_cursor(docs[-1])
+    if backward:
+        docs.reverse()
+    if FAST_JSON:
+        return fast_json([comment_to_dict(d) for d in docs], response)
+    return [comment_to_out(d) for d in docs]
 
 @app.post("/posts/{pid}/comments", response_model=CommentOut, status_code=201) # 댓글 생성
 async def create_comment(pid: str, c: CommentIn, current=Depends(get_current_user)):
     oid = ObjectId(pid)
-    post = await posts.find_one({"_id": oid})
-    if not post:
+    if counter_agg and not await post_cache.get(oid):
         raise HTTPException(404, "post not found")
     doc = {
         "post_id": oid,
@@ -725,16 +2922,65 @@ async def create_comment(pid: str, c: CommentIn, current=Depends(get_current_use
         "body": c.body,
         "created_at": datetime.now(timezone.utc),
     }
-    res = await comments.insert_one(doc)
-    await posts.update_one({"_id": oid}, {"$inc": {"comments_count": 1}})
-    saved = await comments.find_one({"_id": res.inserted_id})
-    return comment_to_out(saved)
+    await comments.insert_one(doc)
+    # 카운트는 댓글 저장이 성공한 뒤에만 (실패 시 카운트만 올라가 남는 일이 없게)
+    if counter_agg:
+        counter_agg.add(oid, "comments_count", 1)
+    else:
+        # 카운터 증가가 곧 존재 확인
+        res = await posts.update_one({"_id": oid, **NOT_DELETED}, {"$inc": {"comments_count": 1, "ver": 1}})
+        if not res.matched_count:
+            await comments.delete_one({"_id": doc["_id"]})     # 글이 없음 → 방금 넣은 댓글 되돌림
+            raise HTTPException(404, "post not found")
+        post_cache.invalidate(oid)
+    hot_feed.bump(oid, comments=1)
+    await emit_post_event(oid, "comment_created", comment_to_json(doc))
+    return comment_to_out(doc)
 
 @app.delete("/posts/{pid}/comments/{cid}", status_code=204)
 async def delete_comment(pid: str, cid: str, current=Depends(get_current_user)):
     oid = ObjectId(pid); coid = ObjectId(cid)
-    cm = await comments.find_one({"_id": coid, "post_id": oid})
-    if not cm: raise HTTPException(404, "comment not found")
-    if cm["author_id"] != str(current["_id"]): raise HTTPException(403, "not owner")
-    await comments.delete_one({"_id": coid})
-    await posts.update_one({"_id": oid}, {"$inc": {"comments_count": -1}})
+    cm = await comments.find_one_and_delete(
+        {"_id": coid, "post_id": oid, "author_id": str(current["_id"])}, projection={"_id": 1},
+    )
+    if not cm:
+        if await comments.find_one({"_id": coid, "post_id": oid}, {"_id": 1}):
+            raise HTTPException(403, "not owner")
+        raise HTTPException(404, "comment not found")
+    hot_feed.bump(oid, comments=-1)
+    await emit_post_event(oid, "comment_deleted", {"id": cid})
+    if counter_agg:
+        counter_agg.add(oid, "comments_count", -1)
+        return
+    await posts.update_one({"_id": oid}, {"$inc": {"comments_count": -1, "ver": 1}})
+    post_cache.invalidate(oid)
+
+@app.get("/posts/{pid}/events")
+async def post_events(pid: str):
+    """
+    Server-Sent Events: comment_created(댓글 JSON), comment_deleted({id}), likes({delta}), post_deleted({}).
+    큐가 넘칠 만큼 느리면 dropped 이벤트 후 종료 → 클라이언트는 글/댓글을 다시 조회.
+    """
+    oid = ObjectId(pid)
+    if not await post_cache.get(oid):
+        raise HTTPException(404, "post not found")
+    sub = event_hub.subscribe(oid)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                msg = await sub.queue.get()
+                if sub.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield msg
+                if sub.closed and sub.queue.empty():   # 글 삭제(post_deleted 까지 보냄)
+                    return
+        finally:                    # 연결 종료(취소) 시 구독 해제
+            event_hub.unsubscribe(oid, sub)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,134 @@
+"""
+응답 압축: 코덱별 줄어든 바이트 vs 요청당 추가 CPU.
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_compression
+
+게시판과 비슷한 한국어 응답 본문(글 상세, 글 목록 full/summary, 댓글 100개, 댓글 NDJSON 스트림)을 만들고
+CompressionMiddleware 가 쓰는 코덱(GzipCodec/BrotliCodec/ZstdCodec)으로 압축한다.
+코덱별 압축 후 크기, 비율, 요청당 CPU(μs)를 출력하고, 압축 컨텍스트 재사용 효과를
+요청마다 새로 만드는 경우와 비교한다(미들웨어는 zstd 만 재사용, gzip/br 은 효과가 없어 새로 만든다).
+brotli/zstandard 가 없으면 그 코덱은 건너뜀.
+"""
+import json
+import os
+import random
+import time
+import zlib
+
+os.environ["COMPRESS_ENCODINGS"] = "zstd,br,gzip"
+
+from app import main  # noqa: E402
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "300"))
+STREAM_CHUNK = 16 * 1024
+
+WORDS = (
+    "오늘 어제 내일 서버 배포 장애 원인 분석 결과 공유 드립니다 질문 있습니다 답변 감사합니다 "
+    "로그인 이메일 인증 비밀번호 변경 댓글 좋아요 게시판 검색 기능 추가 요청 버그 수정 확인 부탁 "
+    "주말 날씨 맑음 비 여행 사진 맛집 추천 커피 카페 공부 시험 회사 퇴근 출근 지하철 버스 "
+    "성능 개선 캐시 인덱스 쿼리 느림 빠름 메모리 사용량 그래프 첨부 링크 참고 하세요 정말 너무 좋네요"
+).split()
+
+
+def text(rng: random.Random, n: int) -> str:
+    out = []
+    for i in range(n):
+        out.append(rng.choice(WORDS))
+        if i % 12 == 11:
+            out[-1] += rng.choice((".", "!", "?", ".\n"))
+    return " ".join(out)
+
+
+def post(rng: random.Random, i: int, body_words: int) -> dict:
+    body = text(rng, body_words)
+    return {
+        "id": f"{0x65f0000000000000 + i:024x}", "title": text(rng, 6), "body": body,
+        "author_id": f"{0x6500000000000000 + i % 50:024x}", "author_username": f"사용자{i % 50}",
+        "comments_count": rng.randint(0, 40), "likes_count": rng.randint(0, 300),
+    }
+
+
+def comment(rng: random.Random, i: int) -> dict:
+    return {
+        "id": f"{0x66f0000000000000 + i:024x}", "post_id": f"{0x65f0000000000000:024x}",
+        "author_id": f"{0x6500000000000000 + i % 50:024x}", "author_username": f"사용자{i % 50}",
+        "body": text(rng, rng.randint(5, 40)), "created_at": f"2026-10-17T09:{i // 60 % 60:02d}:{i % 60:02d}+00:00",
+    }
+
+
+def payloads() -> dict:
+    rng = random.Random(7)
+    dumps = lambda v: json.dumps(v, ensure_ascii=False).encode()  # noqa: E731
+    posts = [post(rng, i, rng.randint(80, 600)) for i in range(20)]
+    summaries = [{k: v for k, v in p.items() if k != "body"} | {"excerpt": p["body"][:200]} for p in posts]
+    cms = [comment(rng, i) for i in range(100)]
+    return {
+        "post detail": dumps(post(rng, 0, 1500)),
+        "list 20 full": dumps(posts),
+        "list 20 summary": dumps(summaries),
+        "comments 100": dumps(cms),
+        "ndjson 500 (stream)": "".join(json.dumps(comment(rng, i), ensure_ascii=False) + "\n"
+                                       for i in range(500)).encode(),
+    }
+
+
+def cpu_us(fn) -> float:
+    fn()
+    t0 = time.process_time()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.process_time() - t0) / ROUNDS * 1e6
+
+
+def streamed(codec, data: bytes) -> bytes:
+    state = codec.begin()
+    out = [codec.chunk(state, data[i:i + STREAM_CHUNK], True) for i in range(0, len(data), STREAM_CHUNK)]
+    out.append(codec.end(state))
+    codec.release(state)
+    return b"".join(out)
+
+
+def context_reuse() -> None:
+    """응답마다 새 압축기 vs 재사용: zlib 은 미리 만든 원본 copy(), zstd 는 ZstdCodec 풀."""
+    data = payloads()["list 20 summary"]
+    proto = zlib.compressobj(main.GZIP_LEVEL, zlib.DEFLATED, 31)
+    cases = [("gzip (copy of primed object)", lambda: zlib.compressobj(main.GZIP_LEVEL, zlib.DEFLATED, 31),
+              proto.copy)]
+    if main.zstandard is not None:
+        codec = main.ZstdCodec()
+
+        def pooled():
+            state = codec.begin()
+            codec.release(state)        # 같은 cctx 를 다음 요청이 다시 씀
+            return state[1]
+        cases.append(("zstd (pooled ZstdCompressor)",
+                      lambda: main.zstandard.ZstdCompressor(level=main.ZSTD_LEVEL).compressobj(), pooled))
+
+    def run(make):
+        c = make()
+        return c.compress(data) + c.flush()
+
+    print(f"\ncontext per request ({len(data)} B)  {'new μs':>8s} {'reused μs':>10s}")
+    for name, fresh, reused in cases:
+        print(f"{name:32s} {cpu_us(lambda: run(fresh)):8.1f} {cpu_us(lambda: run(reused)):10.1f}")
+
+
+def main_bench() -> None:
+    codecs = main.build_codecs()
+    missing = {"br", "zstd", "gzip"} - {c.name for c in codecs}
+    if missing:
+        print(f"(not installed, skipped: {', '.join(sorted(missing))})")
+    print(f"{'payload':22s} {'codec':5s} {'raw B':>8s} {'out B':>8s} {'ratio':>6s} {'saved B':>8s} {'cpu μs':>8s}")
+    for name, data in payloads().items():
+        stream = name.endswith("(stream)")
+        for codec in codecs:
+            out = streamed(codec, data) if stream else codec.compress(data)
+            cpu = cpu_us(lambda: streamed(codec, data) if stream else codec.compress(data))
+            print(f"{name:22s} {codec.name:5s} {len(data):8d} {len(out):8d} {len(out) / len(data):6.2f}"
+                  f" {len(data) - len(out):8d} {cpu:8.1f}")
+    context_reuse()
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,102 @@
+"""
+좋아요 카운터: 즉시 $inc vs write-behind(CounterAggregator) 비교.
+
+실행(backend 디렉터리에서, MongoDB 필요):
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_counter_agg
+
+scratch DB(BENCH_MONGO_DB, 기본 board_bench)에 글을 만들고 인기 글에 몰리는 분포로
+좋아요 이벤트를 흘려 보낸 뒤 처리량과 실제 Mongo 쓰기 수를 출력한다.
+"""
+import asyncio
+import os
+import random
+import time
+
+os.environ["MONGO_DB"] = os.getenv("BENCH_MONGO_DB", "board_bench")
+
+from app import main  # noqa: E402
+
+POSTS = int(os.getenv("BENCH_POSTS", "1000"))
+EVENTS = int(os.getenv("BENCH_EVENTS", "20000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "64"))
+
+
+class CountingPosts:
+    """bulk_write 로 보낸 op 수를 세는 posts 래퍼."""
+    def __init__(self, real):
+        self.real = real
+        self.writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.real, name)
+
+    async def bulk_write(self, ops, **kwargs):
+        self.writes += len(ops)
+        return await self.real.bulk_write(ops, **kwargs)
+
+
+async def seed() -> list:
+    await main.posts.delete_many({})
+    docs = [{"title": f"post {i}", "body": "", "likes_count": 0, "ver": 1} for i in range(POSTS)]
+    res = await main.posts.insert_many(docs)
+    return res.inserted_ids
+
+
+def workload(ids: list) -> list:
+    weights = [1 / (i + 1) for i in range(len(ids))]   # zipf 비슷하게 상위 글에 쏠림
+    return random.choices(ids, weights, k=EVENTS)
+
+
+async def total_likes() -> int:
+    rows = await main.posts.aggregate([{"$group": {"_id": None, "n": {"$sum": "$likes_count"}}}]).to_list(1)
+    return rows[0]["n"] if rows else 0
+
+
+async def run_direct(events: list) -> tuple:
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(oid):
+        async with sem:
+            await main.posts.update_one({"_id": oid}, {"$inc": {"likes_count": 1, "ver": 1}})
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(o) for o in events))
+    return time.perf_counter() - t0, len(events)
+
+
+async def run_write_behind(events: list) -> tuple:
+    counting = CountingPosts(main.posts)
+    real, main.posts = main.posts, counting
+    try:
+        agg = main.CounterAggregator(main.COUNTER_FLUSH_SECONDS, main.COUNTER_FLUSH_MAX_POSTS)
+        agg.start()
+        t0 = time.perf_counter()
+        for i, oid in enumerate(events):
+            agg.add(oid, "likes_count", 1)
+            if i % CONCURRENCY == 0:
+                await asyncio.sleep(0)      # 요청 사이처럼 루프에 양보
+        await agg.close()
+        return time.perf_counter() - t0, counting.writes
+    finally:
+        main.posts = real
+
+
+def report(name: str, elapsed: float, writes: int) -> None:
+    print(f"{name:13s} {EVENTS / elapsed:12.0f} likes/s {writes:8d} mongo writes {writes / elapsed:10.0f} writes/s")
+
+
+async def bench() -> None:
+    events = workload(await seed())
+    elapsed, writes = await run_direct(events)
+    report("direct $inc", elapsed, writes)
+    assert await total_likes() == EVENTS
+
+    events = workload(await seed())
+    elapsed, writes = await run_write_behind(events)
+    report("write-behind", elapsed, writes)
+    assert await total_likes() == EVENTS
+    await main.posts.delete_many({})
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
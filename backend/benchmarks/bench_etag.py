@@ -0,0 +1,77 @@
+"""
+조건부 GET: 처음 보기(200) vs 다시 보기(If-None-Match → 304).
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_etag
+
+컬렉션을 프로젝션을 적용하는 고정 문서 대역으로 바꾸고 ASGI 로 같은 URL 을 반복 호출한다
+(TestClient 는 요청마다 스레드 왕복 비용이 커서 차이가 묻힌다).
+엔드포인트별로 요청당 프로세스 CPU 시간(μs), 응답 바이트(압축 전), Mongo 에서 읽은 바이트를 출력.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ["COMPRESS"] = "0"          # 응답 바이트는 압축 전 기준
+
+from bson import ObjectId  # noqa: E402
+import httpx  # noqa: E402
+
+from app import main  # noqa: E402
+from benchmarks.fakes import FixedCollection  # noqa: E402
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "300"))
+BODY = "게시판 본문 예시 문장입니다. " * 200
+
+
+def make_docs() -> tuple:
+    now = datetime.now(timezone.utc)
+    pid = ObjectId()
+    post_docs = [{
+        "_id": pid if i == 0 else ObjectId(), "title": f"제목 {i}", "body": BODY, "excerpt": BODY[:200],
+        "author_id": str(ObjectId()), "author_username": f"user{i}",
+        "comments_count": i, "likes_count": i * 2, "ver": 3,
+    } for i in range(21)]
+    cms = [{
+        "_id": ObjectId(), "post_id": pid, "author_id": str(ObjectId()), "author_username": f"user{i}",
+        "body": "댓글 내용 " * 20, "created_at": now + timedelta(seconds=i), "ver": 0,
+    } for i in range(21)]
+    return pid, post_docs, cms
+
+
+async def measure(client: httpx.AsyncClient, url: str, coll: FixedCollection, etag: str = None) -> tuple:
+    headers = {"If-None-Match": etag} if etag else {}
+    r = await client.get(url, headers=headers)           # 워밍업
+    coll.bytes_read = 0
+    t0 = time.process_time()
+    for _ in range(ROUNDS):
+        r = await client.get(url, headers=headers)
+    cpu = (time.process_time() - t0) / ROUNDS * 1e6
+    return r, cpu, len(r.content), coll.bytes_read / ROUNDS
+
+
+async def bench() -> None:
+    pid, post_docs, cms = make_docs()
+    main.posts = FixedCollection(post_docs, "posts", track_bytes=True)
+    main.comments = FixedCollection(cms, "comments", track_bytes=True)
+    endpoints = {
+        "GET /posts/{pid}": (f"/posts/{pid}", main.posts),
+        "GET /posts": ("/posts", main.posts),
+        "GET /posts?fields=summary": ("/posts?fields=summary", main.posts),
+        "GET /posts/{pid}/comments": (f"/posts/{pid}/comments", main.comments),
+    }
+    print(f"{'endpoint':26s} {'status':>6s} {'cpu μs':>8s} {'wire B':>8s} {'mongo B':>9s}")
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (url, coll) in endpoints.items():
+            first, cpu, wire, mongo = await measure(client, url, coll)
+            assert first.status_code == 200, (url, first.status_code)
+            print(f"{name:26s} {200:6d} {cpu:8.0f} {wire:8d} {mongo:9.0f}")
+            again, cpu, wire, mongo = await measure(client, url, coll, first.headers["etag"])
+            assert again.status_code == 304, (url, again.status_code)
+            print(f"{'':26s} {304:6d} {cpu:8.0f} {wire:8d} {mongo:9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
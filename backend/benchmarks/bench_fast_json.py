@@ -0,0 +1,99 @@
+"""
+응답 직렬화 CPU 비교: 기본 경로(pydantic 모델 + response_model 검증 + json) vs FAST_JSON(orjson).
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_fast_json
+
+컬렉션을 고정 문서를 돌려주는 대역으로 바꾸고 TestClient 로 엔드포인트를 호출해
+요청당 프로세스 CPU 시간(μs)을 잰다. DB/네트워크가 빠지므로 두 경로 차이가 곧 직렬화 비용 차이.
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ["COMPRESS"] = "0"          # 압축 비용이 섞이지 않게
+
+from bson import ObjectId  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main  # noqa: E402
+from benchmarks.fakes import FixedCollection  # noqa: E402
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200"))
+BODY = "게시판 본문 예시 문장입니다. " * 40
+
+
+def make_docs():
+    now = datetime.now(timezone.utc)
+    pid = ObjectId()
+    cms = [{
+        "_id": ObjectId(), "post_id": pid, "author_id": str(ObjectId()), "author_username": f"user{i}",
+        "body": "댓글 내용 " * 10, "created_at": now + timedelta(seconds=i), "ver": 0,
+    } for i in range(101)]
+    post_docs = [{
+        "_id": ObjectId(), "title": f"제목 {i}", "body": BODY, "excerpt": BODY[:200],
+        "author_id": str(ObjectId()), "author_username": f"user{i}",
+        "comments_count": i, "likes_count": i * 2, "ver": 1,
+    } for i in range(101)]
+    detail = [{**post_docs[0], "_id": pid, "comments": cms}]
+    return pid, post_docs, cms, detail
+
+
+def cpu_per_request(client: TestClient, url: str) -> float:
+    client.get(url)                                   # 워밍업
+    t0 = time.process_time()
+    for _ in range(ROUNDS):
+        r = client.get(url)
+        assert r.status_code == 200, (url, r.status_code)
+    return (time.process_time() - t0) / ROUNDS * 1e6
+
+
+def serialization_only(post_docs: list, cms: list) -> None:
+    """HTTP 왕복 없이 변환+검증+인코딩만: FastAPI 가 response_model 로 하는 일을 TypeAdapter 로 재현."""
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    cases = {
+        "100 posts": (post_docs[:100], main.post_to_out, main.post_to_dict, TypeAdapter(List[main.PostOut])),
+        "100 comments": (cms[:100], main.comment_to_out, main.comment_to_dict, TypeAdapter(List[main.CommentOut])),
+    }
+    print(f"\n{'serialize only':28s} {'pydantic μs':>12s} {'fast μs':>10s} {'speedup':>8s}")
+    for name, (docs, to_out, to_dict, adapter) in cases.items():
+        t0 = time.process_time()
+        for _ in range(ROUNDS):
+            adapter.dump_json(adapter.validate_python([to_out(d) for d in docs]))
+        slow = (time.process_time() - t0) / ROUNDS * 1e6
+        t0 = time.process_time()
+        for _ in range(ROUNDS):
+            main.orjson.dumps([to_dict(d) for d in docs])
+        fast = (time.process_time() - t0) / ROUNDS * 1e6
+        print(f"{name:28s} {slow:12.0f} {fast:10.0f} {slow / fast:7.2f}x")
+
+
+def main_bench() -> None:
+    if main.orjson is None:
+        raise SystemExit("orjson is not installed")
+    pid, post_docs, cms, detail = make_docs()
+    main.comments = FixedCollection(cms, "comments")
+    client = TestClient(main.app)
+    endpoints = {
+        "GET /posts?limit=100": ("/posts?limit=100", post_docs),
+        "GET /posts?fields=summary": ("/posts?limit=100&fields=summary", post_docs),
+        "GET /posts/{pid}": (f"/posts/{pid}", post_docs),
+        "GET /posts/{pid}/comments": (f"/posts/{pid}/comments?limit=100", post_docs),
+        "GET /posts/{pid}/detail": (f"/posts/{pid}/detail", detail),
+    }
+    print(f"{'endpoint':28s} {'pydantic μs':>12s} {'fast μs':>10s} {'speedup':>8s}")
+    for name, (url, docs) in endpoints.items():
+        main.posts = FixedCollection(docs, "posts")
+        results = []
+        for fast in (False, True):
+            main.FAST_JSON = fast
+            results.append(cpu_per_request(client, url))
+        print(f"{name:28s} {results[0]:12.0f} {results[1]:10.0f} {results[0] / results[1]:7.2f}x")
+    serialization_only(post_docs, cms)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,72 @@
+"""
+GET /posts 목록: 예전 전체 문서 vs 현재 기본(fields=full) vs 요약(fields=summary).
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_list_payload
+
+본문이 큰 글(BENCH_BODY_CHARS 자)과 레거시 likes 배열(BENCH_LIKES 개)로 된 글 목록을 대역 컬렉션에 두고
+프로젝션을 Mongo 처럼 적용한다. Mongo → 앱 전송은 BSON 크기 / BENCH_MONGO_MBPS 만큼 걸린다고 보고,
+요청당 Mongo 에서 읽은 바이트, 응답 바이트(압축 전), p50/p99 지연을 출력한다.
+"before" 는 프로젝션 없이 전체 문서를 읽던 예전 목록(응답 모양은 fields=full 과 같음).
+"""
+import asyncio
+import os
+import statistics
+import time
+
+os.environ["COMPRESS"] = "0"          # 응답 바이트는 압축 전 기준(압축은 bench_compression)
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+from app import main  # noqa: E402
+from benchmarks.fakes import FixedCollection  # noqa: E402
+
+LIMIT = int(os.getenv("BENCH_LIMIT", "20"))
+READS = int(os.getenv("BENCH_READS", "300"))
+BODY_CHARS = int(os.getenv("BENCH_BODY_CHARS", "20000"))
+LIKES = int(os.getenv("BENCH_LIKES", "2000"))
+MONGO_MBPS = float(os.getenv("BENCH_MONGO_MBPS", "100"))
+
+
+def make_docs() -> list:
+    body = ("오늘 게시판에 올리는 긴 글입니다. 여러 문단으로 된 본문이 이어집니다. " * (BODY_CHARS // 40 + 1))[:BODY_CHARS]
+    return [{
+        "_id": ObjectId(), "title": f"제목 {i}", "body": body, "excerpt": main.make_excerpt(body),
+        "author_id": str(ObjectId()), "author_username": f"user{i}",
+        "comments_count": i, "likes_count": LIKES, "likes": [str(ObjectId()) for _ in range(LIKES)], "ver": 1,
+    } for i in range(LIMIT + 1)]
+
+
+async def measure(client: httpx.AsyncClient, url: str) -> tuple:
+    main.posts.bytes_read = 0
+    lat, size = [], 0
+    for _ in range(READS):
+        t0 = time.perf_counter()
+        r = await client.get(url)
+        lat.append(time.perf_counter() - t0)
+        assert r.status_code == 200, r.status_code
+        size = len(r.content)
+    q = statistics.quantiles(lat, n=100, method="inclusive")
+    return main.posts.bytes_read / READS, size, q[49], q[98]
+
+
+async def bench() -> None:
+    main.posts = FixedCollection(make_docs(), "posts", mongo_mbps=MONGO_MBPS)
+    transport = httpx.ASGITransport(app=main.app)
+    cases = (
+        ("before (no projection)", f"/posts?limit={LIMIT}", True),
+        ("fields=full", f"/posts?limit={LIMIT}", False),
+        ("fields=summary", f"/posts?limit={LIMIT}&fields=summary", False),
+    )
+    print(f"{LIMIT} posts/page, body {BODY_CHARS} chars, {LIKES} legacy likes/post, Mongo {MONGO_MBPS:.0f} MB/s")
+    print(f"{'mode':24s} {'mongo KiB':>10s} {'wire KiB':>9s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url, ignore in cases:
+            main.posts.ignore_projection = ignore
+            mongo_bytes, wire, p50, p99 = await measure(client, url)
+            print(f"{name:24s} {mongo_bytes / 1024:10.1f} {wire / 1024:9.1f} {p50 * 1000:8.2f} {p99 * 1000:8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
@@ -0,0 +1,99 @@
+"""
+로그인(bcrypt) 부하 중 GET /posts 지연.
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_login_load
+
+컬렉션을 고정 문서 대역으로 바꾸고 ASGI 로 직접 호출한다.
+1) 부하 없음  2) 로그인 동시 BENCH_LOGINS 개 + HashService 풀  3) 같은 부하 + bcrypt 를 루프에서 직접 실행(이전 방식)
+각각에서 GET /posts 를 연속 호출해 p50/p99 지연을 출력한다.
+"""
+import asyncio
+import os
+import statistics
+import time
+
+os.environ["COMPRESS"] = "0"
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+from app import main  # noqa: E402
+from benchmarks.fakes import FixedCollection  # noqa: E402
+
+LOGINS = int(os.getenv("BENCH_LOGINS", "32"))
+READS = int(os.getenv("BENCH_READS", "200"))
+INLINE_READS = int(os.getenv("BENCH_INLINE_READS", "5"))
+READ_TIMEOUT = float(os.getenv("BENCH_READ_TIMEOUT", "10"))   # 인라인이면 읽기가 아예 끝나지 않을 수 있다
+
+
+def install_fakes() -> None:
+    main.posts = FixedCollection([{
+        "_id": ObjectId(), "title": f"t{i}", "body": "본문 " * 50, "author_id": "a", "author_username": "u",
+        "comments_count": 0, "likes_count": 0, "ver": 1,
+    } for i in range(21)], "posts")
+    main.users = FixedCollection([{
+        "_id": ObjectId(), "email": "user@example.com", "username": "user",
+        "password_hash": main.hash_password("secret"), "email_verified": True,
+    }], "users")
+
+
+async def read_latencies(client: httpx.AsyncClient, reads: int) -> list:
+    out = []
+    for _ in range(reads):
+        t0 = time.perf_counter()
+        try:
+            r = await asyncio.wait_for(client.get("/posts"), READ_TIMEOUT)
+        except asyncio.TimeoutError:
+            out.append(None)
+            continue
+        assert r.status_code == 200
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+async def login_load(client: httpx.AsyncClient, stop: asyncio.Event) -> None:
+    async def one():
+        while not stop.is_set():
+            await client.post("/auth/login", json={"email": "user@example.com", "password": "wrong"})
+    await asyncio.gather(*(one() for _ in range(LOGINS)))
+
+
+async def scenario(client: httpx.AsyncClient, with_logins: bool, reads: int = READS) -> list:
+    stop = asyncio.Event()
+    load = asyncio.create_task(login_load(client, stop)) if with_logins else None
+    await asyncio.sleep(0.2 if with_logins else 0)
+    try:
+        return await read_latencies(client, reads)
+    finally:
+        stop.set()
+        if load:
+            await load
+
+
+def report(name: str, samples: list) -> None:
+    done = [s for s in samples if s is not None]
+    starved = len(samples) - len(done)
+    if len(done) < 2:
+        print(f"{name:32s} {starved}/{len(samples)} reads timed out (>{READ_TIMEOUT:.0f}s)")
+        return
+    q = statistics.quantiles(done, n=100, method="inclusive")
+    print(f"{name:32s} p50 {q[49] * 1000:8.1f} ms   p99 {q[98] * 1000:8.1f} ms   timed out {starved}/{len(samples)}")
+
+
+async def bench() -> None:
+    install_fakes()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        report("idle", await scenario(client, False))
+        report(f"{LOGINS} logins, bcrypt pool", await scenario(client, True))
+
+        async def inline_run(fn, *args):          # 이전 방식: 이벤트 루프에서 직접 bcrypt
+            return fn(*args)
+        main.hasher._run = inline_run
+        report(f"{LOGINS} logins, bcrypt inline", await scenario(client, True, INLINE_READS))
+    main.hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
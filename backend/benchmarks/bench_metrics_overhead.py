@@ -0,0 +1,86 @@
+"""
+메트릭 수집 오버헤드: 아무것도 안 하는 ASGI 앱 vs MetricsMiddleware 로 감싼 앱.
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_metrics_overhead
+
+서버/HTTP 없이 ASGI 호출을 직접 반복해 요청당 벽시계 시간(μs)을 잰다.
+1) 미들웨어만  2) 요청마다 Mongo 명령 BENCH_COMMANDS 개를 리스너로 기록  3) SSE 응답
+리스너 한 번 호출 비용(요청 안 / 백그라운드)도 따로 출력.
+"""
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ["COMPRESS"] = "0"
+
+from app import main  # noqa: E402
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200000"))
+COMMANDS = int(os.getenv("BENCH_COMMANDS", "3"))
+
+listener = main.MongoCommandMetrics()
+EVENT = SimpleNamespace(command_name="find", duration_micros=120)
+JSON_START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+SSE_START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]}
+BODY = {"type": "http.response.body", "body": b"{}"}
+SCOPE = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+
+def make_app(start: dict, commands: int):
+    async def app(scope, receive, send):
+        for _ in range(commands):
+            listener.succeeded(EVENT)           # Motor 가 명령마다 부르는 것과 같은 경로
+        await send(start)
+        await send(BODY)
+    return app
+
+
+async def receive():
+    return {"type": "http.disconnect"}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(app) -> float:
+    for _ in range(1000):
+        await app(SCOPE, receive, send)
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        await app(SCOPE, receive, send)
+    return (time.perf_counter() - t0) / ROUNDS * 1e6
+
+
+def listener_us(in_request: bool) -> float:
+    token = main.mongo_calls.set([]) if in_request else None
+    n = ROUNDS
+    t0 = time.perf_counter()
+    for _ in range(n):
+        listener.succeeded(EVENT)
+    elapsed = time.perf_counter() - t0
+    if token is not None:
+        main.mongo_calls.reset(token)
+    main.metrics.drain_background_mongo()
+    return elapsed / n * 1e6
+
+
+async def bench() -> None:
+    print(f"{'case':34s} {'bare μs':>8s} {'wrapped μs':>11s} {'overhead μs':>12s}")
+    cases = (
+        ("trivial JSON response", JSON_START, 0),
+        (f"JSON + {COMMANDS} mongo commands", JSON_START, COMMANDS),
+        ("SSE response", SSE_START, 0),
+    )
+    for name, start, commands in cases:
+        bare = await per_request_us(make_app(start, 0))          # 메트릭이 꺼지면 리스너도 없음
+        app = make_app(start, commands)
+        wrapped = await per_request_us(main.MetricsMiddleware(app))
+        print(f"{name:34s} {bare:8.2f} {wrapped:11.2f} {wrapped - bare:12.2f}")
+    print(f"\nlistener per command: in request {listener_us(True):.2f} μs, background {listener_us(False):.2f} μs")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
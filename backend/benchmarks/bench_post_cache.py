@@ -0,0 +1,76 @@
+"""
+글 단건 캐시(PostCache) 적중률 / 아낀 조회 수.
+
+실행(backend 디렉터리에서, MongoDB 불필요):
+    python -m benchmarks.bench_post_cache
+
+posts.find_one 을 BENCH_QUERY_MS 만큼 걸리는 대역으로 바꾸고, 인기 글에 몰리는(zipf 비슷한)
+분포로 BENCH_READS 개의 GET /posts/{id} 조회를 동시 BENCH_CONCURRENCY 개씩 흘린다.
+캐시 없이 보냈을 조회 수(=읽기 수)와 실제 조회 수를 비교해 적중률·합류(single-flight)·절약량을 출력.
+"""
+import asyncio
+import os
+import random
+import time
+
+from bson import ObjectId
+
+from app import main
+
+POSTS = int(os.getenv("BENCH_POSTS", "5000"))
+READS = int(os.getenv("BENCH_READS", "50000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "64"))
+QUERY_MS = float(os.getenv("BENCH_QUERY_MS", "2"))
+WRITE_RATIO = float(os.getenv("BENCH_WRITE_RATIO", "0.01"))   # 읽기 중 이 비율로 invalidate(수정/좋아요 등)
+
+
+class SlowPosts:
+    """find_one 이 QUERY_MS 걸리는 posts 대역."""
+    name = "posts"
+
+    def __init__(self, ids: list):
+        self.docs = {oid: {"_id": oid, "title": "제목", "body": "본문 " * 100, "ver": 1} for oid in ids}
+        self.queries = 0
+
+    async def find_one(self, flt, *args, **kwargs):
+        self.queries += 1
+        await asyncio.sleep(QUERY_MS / 1000)
+        doc = self.docs.get(flt["_id"])
+        return dict(doc) if doc else None
+
+
+def workload(ids: list) -> list:
+    weights = [1 / (i + 1) for i in range(len(ids))]
+    return random.choices(ids, weights, k=READS)
+
+
+async def run(events: list, ttl: float) -> tuple:
+    cache = main.PostCache(main.POST_CACHE_MAX, ttl)
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(oid):
+        async with sem:
+            if random.random() < WRITE_RATIO:
+                cache.invalidate(oid)
+            await cache.get(oid)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(o) for o in events))
+    return time.perf_counter() - t0, cache.stats()
+
+
+async def bench() -> None:
+    ids = [ObjectId() for _ in range(POSTS)]
+    events = workload(ids)
+    print(f"{READS} reads over {POSTS} posts, cache max {main.POST_CACHE_MAX}, query {QUERY_MS} ms")
+    print(f"{'ttl':>6s} {'hit %':>7s} {'queries':>9s} {'coalesced':>10s} {'saved %':>8s} {'reads/s':>9s}")
+    for ttl in (0.0, 1.0, main.POST_CACHE_TTL_SECONDS, 30.0):
+        main.posts = SlowPosts(ids)
+        elapsed, st = await run(events, ttl)
+        hit = st["hits"] / max(st["hits"] + st["misses"], 1) * 100
+        saved = (READS - main.posts.queries) / READS * 100
+        print(f"{ttl:6.1f} {hit:7.1f} {main.posts.queries:9d} {st['coalesced']:10d} {saved:8.1f} {READS / elapsed:9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
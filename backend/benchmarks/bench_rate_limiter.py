@@ -0,0 +1,70 @@
+"""
+레이트리밋 백엔드 처리량과 메모리.
+
+실행(backend 디렉터리에서):
+    python -m benchmarks.bench_rate_limiter
+    BENCH_MONGO=1 MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_rate_limiter   # mongo 백엔드 포함
+
+- memory: 같은 키 반복 / 매번 다른 키(LRU 삽입·축출) 의 초당 hit 수
+- memory: 키 1M 개를 채웠을 때 tracemalloc 기준 사용량과 키당 바이트
+- mongo(선택): 동시 64 요청으로 초당 hit 수 (scratch DB 의 rate_limits 사용)
+"""
+import asyncio
+import os
+import time
+import tracemalloc
+
+os.environ["MONGO_DB"] = os.getenv("BENCH_MONGO_DB", "board_bench")
+
+from app import main  # noqa: E402
+
+OPS = int(os.getenv("BENCH_OPS", "200000"))
+KEYS = int(os.getenv("BENCH_KEYS", "1000000"))
+
+
+async def ops_per_sec(limiter, keys) -> float:
+    t0 = time.perf_counter()
+    for key in keys:
+        await limiter.hit(key, 1_000_000, 60)
+    return len(keys) / (time.perf_counter() - t0)
+
+
+async def memory_at(n: int) -> tuple:
+    limiter = main.MemoryRateLimiter(max_keys=n)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        await limiter.hit(f"start:10.0.{i >> 16 & 255}.{i & 255}:user{i}@example.com", 5, 300)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used, used / n
+
+
+async def mongo_ops_per_sec(n: int, concurrency: int = 64) -> float:
+    limiter = main.MongoRateLimiter(main.rate_limits)
+    await main.rate_limits.delete_many({})
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            await limiter.hit(f"bench:{i % 1000}", 1_000_000, 60)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    rate = n / (time.perf_counter() - t0)
+    await main.rate_limits.delete_many({})
+    return rate
+
+
+async def bench() -> None:
+    mem = main.MemoryRateLimiter(max_keys=100_000)
+    print(f"memory  same key      {await ops_per_sec(mem, ['k'] * OPS):12,.0f} hits/s")
+    print(f"memory  distinct keys {await ops_per_sec(mem, [f'k{i}' for i in range(OPS)]):12,.0f} hits/s")
+    used, per_key = await memory_at(KEYS)
+    print(f"memory  {KEYS:,} keys   {used / 2**20:10.1f} MiB ({per_key:.0f} B/key)")
+    if os.getenv("BENCH_MONGO") == "1":
+        print(f"mongo   64 concurrent {await mongo_ops_per_sec(20_000):12,.0f} hits/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
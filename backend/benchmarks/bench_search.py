@@ -0,0 +1,118 @@
+"""
+GET /posts/search 지연: 텍스트 인덱스($text) vs 2-gram 인덱스(SEARCH_NGRAM).
+
+실행(backend 디렉터리에서, MongoDB 필요):
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_search
+
+scratch DB(BENCH_MONGO_DB, 기본 board_bench)에 한국어 합성 글 BENCH_POSTS 개(기본 100만)를 넣고
+두 인덱스를 만든 뒤, 질의마다 첫 페이지와 커서로 BENCH_PAGES 번째 페이지까지의 지연 p50/p99 를 출력한다.
+이미 채워 둔 DB 를 다시 쓰려면 BENCH_SKIP_SEED=1.
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ["MONGO_DB"] = os.getenv("BENCH_MONGO_DB", "board_bench")
+os.environ["COMPRESS"] = "0"
+
+import httpx  # noqa: E402
+
+from app import main  # noqa: E402
+
+POSTS = int(os.getenv("BENCH_POSTS", "1000000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "50"))
+PAGES = int(os.getenv("BENCH_PAGES", "5"))
+SKIP_SEED = os.getenv("BENCH_SKIP_SEED", "0") == "1"
+BATCH = 10_000
+
+NOUNS = (
+    "게시판 서버 데이터베이스 인덱스 검색 성능 캐시 로그인 비밀번호 이메일 댓글 좋아요 사진 여행 음식 "
+    "커피 회사 학교 공부 시험 운동 날씨 주말 영화 음악 고양이 강아지 자전거 지하철 버스 카페 "
+    "프로그래밍 파이썬 자바스크립트 배포 장애 모니터링 알림 질문 답변 후기 추천 가격 할인 이벤트"
+).split()
+PARTICLES = ("", "", "에", "에서", "을", "를", "이", "가", "은", "는", "의", "으로", "와", "도")
+# (설명, 질의) — 조사 붙은 어절 속 부분 일치는 $text 가 못 찾는 경우
+QUERIES = (
+    ("rare word", "자전거"),
+    ("common word", "게시판"),
+    ("two words", "파이썬 배포"),
+    ("inflected form", "게시판에서"),
+    ("latin", "cache"),
+)
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(NOUNS) + rng.choice(PARTICLES) for _ in range(n))
+
+
+async def seed() -> None:
+    rng = random.Random(42)
+    await main.posts.delete_many({})
+    main.SEARCH_NGRAM = True            # search_fields 가 gram 필드를 채우도록
+    for start in range(0, POSTS, BATCH):
+        docs = []
+        for _ in range(min(BATCH, POSTS - start)):
+            title = sentence(rng, rng.randint(3, 6))
+            body = sentence(rng, rng.randint(30, 80))
+            if rng.random() < 0.05:
+                body += " cache hit ratio"
+            docs.append({
+                "title": title, "body": body, "excerpt": main.make_excerpt(body),
+                "author_id": "bench", "author_username": "bench",
+                "comments_count": 0, "likes_count": 0, "ver": 1,
+                **main.search_fields(title, body),
+            })
+        await main.posts.insert_many(docs, ordered=False)
+    await main.posts.create_index(
+        [("title", "text"), ("body", "text")],
+        weights={"title": main.SEARCH_TITLE_WEIGHT, "body": 1},
+        default_language="none",
+        name="posts_text",
+    )
+    await main.posts.create_index("search_grams")
+
+
+async def run_query(client: httpx.AsyncClient, q: str) -> tuple:
+    """(첫 페이지 초, PAGES 페이지까지 누적 초, 첫 페이지 결과 수)"""
+    t0 = time.perf_counter()
+    r = await client.get("/posts/search", params={"q": q})
+    first = time.perf_counter() - t0
+    hits = len(r.json())
+    cursor = r.headers.get("x-next-cursor")
+    for _ in range(PAGES - 1):
+        if not cursor:
+            break
+        r = await client.get("/posts/search", params={"q": q, "cursor": cursor})
+        cursor = r.headers.get("x-next-cursor")
+    return first, time.perf_counter() - t0, hits
+
+
+def pct(samples: list, p: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[p - 1] * 1000
+
+
+async def bench() -> None:
+    if not SKIP_SEED:
+        t0 = time.perf_counter()
+        await seed()
+        print(f"seeded {POSTS} posts in {time.perf_counter() - t0:.0f}s")
+    transport = httpx.ASGITransport(app=main.app)
+    print(f"{'mode':7s} {'query':16s} {'hits':>5s} {'p50 ms':>8s} {'p99 ms':>8s} {f'{PAGES}p p50':>9s} {f'{PAGES}p p99':>9s}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for mode, ngram in (("text", False), ("ngram", True)):
+            main.SEARCH_NGRAM = ngram
+            for name, q in QUERIES:
+                await run_query(client, q)                  # 워밍업(인덱스/캐시)
+                firsts, totals, hits = [], [], 0
+                for _ in range(ROUNDS):
+                    first, total, hits = await run_query(client, q)
+                    firsts.append(first)
+                    totals.append(total)
+                print(f"{mode:7s} {name:16s} {hits:5d} {pct(firsts, 50):8.1f} {pct(firsts, 99):8.1f}"
+                      f" {pct(totals, 50):9.1f} {pct(totals, 99):9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
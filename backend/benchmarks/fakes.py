@@ -0,0 +1,84 @@
+"""
+벤치마크 공용 Motor 컬렉션 대역(MongoDB 불필요).
+
+FixedCollection 은 고정 문서 목록을 돌려주면서
+- find/find_one 프로젝션을 Mongo 처럼 적용하고(ignore_projection=True 면 예전처럼 전체 문서)
+- 읽은 문서의 BSON 크기를 bytes_read 에 더하고(track_bytes=True)
+- mongo_mbps 를 주면 그 속도로 Mongo → 앱 전송 시간을 기다린다.
+조회마다 한 번은 이벤트 루프에 양보한다(실제 드라이버처럼).
+"""
+import asyncio
+from typing import Optional
+
+import bson
+
+from app import main
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return dict(doc)                 # 핸들러가 pop 해도 원본 유지
+    if all(v == 0 for v in projection.values()):
+        return {k: v for k, v in doc.items() if k not in projection}
+    out = {"_id": doc["_id"]}
+    for k, v in projection.items():
+        if k == "excerpt" and isinstance(v, dict):      # {"$ifNull": ["$excerpt", {"$substrCP": ...}]}
+            out[k] = doc.get("excerpt") or doc["body"][:main.EXCERPT_LEN]
+        elif k in doc:
+            out[k] = doc[k]
+    return out
+
+
+class Cursor:
+    def __init__(self, coll: "FixedCollection", projection: Optional[dict] = None):
+        self.coll = coll
+        self.projection = projection
+        self.n = 0
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    async def to_list(self, length=None):
+        docs = self.coll.docs[:self.n] if self.n else self.coll.docs
+        return await self.coll.read([project(d, self.coll.projection_for(self.projection)) for d in docs])
+
+
+class FixedCollection:
+    def __init__(self, docs: list, name: str = "fixed", track_bytes: bool = False, mongo_mbps: float = 0):
+        self.docs = docs
+        self.name = name
+        self.track_bytes = track_bytes or mongo_mbps > 0
+        self.mongo_mbps = mongo_mbps
+        self.ignore_projection = False
+        self.bytes_read = 0
+
+    def projection_for(self, projection: Optional[dict]) -> Optional[dict]:
+        return None if self.ignore_projection else projection
+
+    async def read(self, docs: list) -> list:
+        size = sum(len(bson.encode(d)) for d in docs) if self.track_bytes else 0
+        self.bytes_read += size
+        await asyncio.sleep(size / (self.mongo_mbps * 1e6) if self.mongo_mbps else 0)
+        return docs
+
+    def find(self, query=None, projection=None, **kwargs):
+        return Cursor(self, projection)
+
+    def aggregate(self, pipeline=None, **kwargs):      # 파이프라인 결과 모양의 문서를 docs 로 넣어 둔다
+        return Cursor(self)
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        if not self.docs:
+            return None
+        docs = await self.read([project(self.docs[0], self.projection_for(projection))])
+        return docs[0]
@@ -0,0 +1,141 @@
+"""
+테스트 공용 준비물.
+- backend/ 를 import 경로에 넣어 `from app import main` 으로 불러옴
+- fake_db: main 모듈의 Motor 컬렉션들을 호출 기록용 대역으로 바꿔 끼움(실제 MongoDB 불필요)
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import main  # noqa: E402
+
+COLLECTIONS = (
+    "posts", "users", "comments", "verifs", "veri_tokens", "post_likes", "rate_limits",
+    "purge_jobs", "counters", "mail_outbox", "event_log", "metrics_snapshots",
+)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for d in self.docs:
+            yield d
+
+
+class FakeCollection:
+    """
+    호출마다 (컬렉션, 메서드)를 calls 에 남기고 미리 정한 결과를 돌려준다.
+    - find_one_result: find_one / find_one_and_* 결과
+    - find_results: find / aggregate 결과
+    - matched: update/delete 가 맞춘 문서 수
+    """
+    def __init__(self, name: str, calls: list):
+        self.name = name
+        self.calls = calls
+        self.find_one_result = None
+        self.find_results: list = []
+        self.matched = 1
+        self.updates: list = []     # update_one 에 넘어온 (filter, update)
+
+    def _log(self, method: str) -> None:
+        self.calls.append((self.name, method))
+
+    def _result(self, upsert: bool = False):
+        return SimpleNamespace(
+            matched_count=self.matched, modified_count=self.matched, deleted_count=self.matched,
+            upserted_id=ObjectId() if upsert else None,
+        )
+
+    async def insert_one(self, doc, session=None):
+        self._log("insert_one")
+        doc.setdefault("_id", ObjectId())
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, flt, update, upsert=False, session=None):
+        self._log("update_one")
+        self.updates.append((flt, update))
+        return self._result(upsert)
+
+    async def update_many(self, flt, update, session=None):
+        self._log("update_many")
+        return self._result()
+
+    async def replace_one(self, flt, doc, upsert=False, session=None):
+        self._log("replace_one")
+        return self._result(upsert)
+
+    async def delete_one(self, flt, session=None):
+        self._log("delete_one")
+        return self._result()
+
+    async def delete_many(self, flt, session=None):
+        self._log("delete_many")
+        return self._result()
+
+    async def find_one(self, *args, **kwargs):
+        self._log("find_one")
+        return self.find_one_result
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self._log("find_one_and_update")
+        return self.find_one_result
+
+    async def find_one_and_delete(self, *args, **kwargs):
+        self._log("find_one_and_delete")
+        return self.find_one_result
+
+    def find(self, *args, **kwargs):
+        self._log("find")
+        return FakeCursor(self.find_results)
+
+    def aggregate(self, *args, **kwargs):
+        self._log("aggregate")
+        return FakeCursor(self.find_results)
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self._log("bulk_write")
+        return SimpleNamespace(modified_count=len(ops))
+
+    async def count_documents(self, *args, **kwargs):
+        self._log("count_documents")
+        return len(self.find_results)
+
+    async def estimated_document_count(self):
+        self._log("estimated_document_count")
+        return len(self.find_results)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    calls: list = []
+    fakes = {name: FakeCollection(name, calls) for name in COLLECTIONS}
+    for name, fake in fakes.items():
+        monkeypatch.setattr(main, name, fake)
+    main.post_cache.cache.clear()
+    main.total_cache.clear()
+    return SimpleNamespace(calls=calls, **fakes)
@@ -0,0 +1,43 @@
+import asyncio
+import zlib
+
+from app import main
+
+
+async def run_stream(chunks: list) -> list:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "GET", "path": "/s", "headers": [(b"accept-encoding", b"gzip")]}
+    middleware = main.CompressionMiddleware(app, minimum_size=0)
+    middleware.codecs = [main.GzipCodec()]
+    await middleware(scope, receive, send)
+    return sent
+
+
+def test_stream_chunks_are_flushed_as_they_arrive():
+    chunks = [b'{"n": 1}\n', b'{"n": 2}\n', b'{"n": 3}\n']
+    sent = asyncio.run(run_stream(chunks))
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+
+    d = zlib.decompressobj(31)
+    assert d.decompress(bodies[0]) == chunks[0]          # 첫 배치가 버퍼에 남지 않고 바로 풀림
+    assert d.decompress(bodies[1]) == chunks[1]
+    assert d.decompress(b"".join(bodies[2:])) == chunks[2]
+    assert d.eof
+
+
+def test_oneshot_gzip_round_trip():
+    data = "게시판 본문 ".encode() * 500
+    assert zlib.decompress(main.GzipCodec().compress(data), 31) == data
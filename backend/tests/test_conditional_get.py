@@ -0,0 +1,50 @@
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app import main
+
+pytestmark = pytest.mark.skipif(not main.COMPRESS_ENABLED, reason="compression middleware disabled")
+
+
+@pytest.fixture
+def client(fake_db):
+    return TestClient(main.app)
+
+
+def get_twice(client, url: str, encoding: str) -> tuple:
+    first = client.get(url, headers={"Accept-Encoding": encoding})
+    again = client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": first.headers["etag"]})
+    return first, again
+
+
+def test_compressed_200_and_304_carry_same_weak_etag(client, fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t", "body": "본문 " * 2000, "ver": 4}
+    first, again = get_twice(client, f"/posts/{oid}", "gzip")
+
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].startswith("W/")
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_small_uncompressed_200_still_matches_304_form(client, fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t", "body": "짧음", "ver": 1}
+    first, again = get_twice(client, f"/posts/{oid}", "gzip")
+
+    assert "content-encoding" not in first.headers
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_identity_keeps_strong_etag(client, fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t", "body": "본문 " * 2000, "ver": 4}
+    first, again = get_twice(client, f"/posts/{oid}", "identity")
+
+    assert not first.headers["etag"].startswith("W/")
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app import main
+
+
+def test_close_waits_for_inflight_flush(fake_db):
+    applied = []
+    started = asyncio.Event()
+
+    async def slow_bulk_write(ops, ordered=True):
+        started.set()
+        await asyncio.sleep(0.05)
+        applied.extend(ops)
+
+    fake_db.posts.bulk_write = slow_bulk_write
+
+    async def scenario():
+        agg = main.CounterAggregator(interval=60, max_posts=1)
+        agg.start()
+        agg.add(ObjectId(), "likes_count", 1)      # max_posts=1 → 바로 flush 시작
+        await started.wait()
+        agg.add(ObjectId(), "likes_count", 1)      # flush 도중 들어온 증감
+        await agg.close()
+        return agg
+
+    agg = asyncio.run(scenario())
+    assert len(applied) == 2
+    assert agg._pending == {}
+
+
+def test_bulk_write_error_requeues_only_failed_ops(fake_db):
+    ok, bad = ObjectId(), ObjectId()
+
+    async def partial_bulk_write(ops, ordered=True):
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 2, "errmsg": "boom"}]})
+
+    fake_db.posts.bulk_write = partial_bulk_write
+    agg = main.CounterAggregator(interval=60, max_posts=100)
+    agg.add(ok, "likes_count", 1)
+    agg.add(bad, "likes_count", 2)
+    with pytest.raises(BulkWriteError):
+        asyncio.run(agg.flush())
+    assert agg._pending == {bad: {"likes_count": 2}}
+
+
+def test_unknown_failure_requeues_everything(fake_db):
+    oid = ObjectId()
+
+    async def broken_bulk_write(ops, ordered=True):
+        raise ConnectionError("down")
+
+    fake_db.posts.bulk_write = broken_bulk_write
+    agg = main.CounterAggregator(interval=60, max_posts=100)
+    agg.add(oid, "comments_count", 3)
+    with pytest.raises(ConnectionError):
+        asyncio.run(agg.flush())
+    assert agg._pending == {oid: {"comments_count": 3}}
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app import main
+
+
+def test_post_cursor_round_trip():
+    oid = ObjectId()
+    token = main.encode_cursor(oid)
+    assert "=" not in token
+    assert main.decode_cursor(token) == oid
+    assert main.decode_cursor(str(oid)) == oid     # 예전 클라이언트의 hex id 도 받음
+
+
+@pytest.mark.parametrize("created", [
+    datetime(2026, 10, 17, 9, 30, 15, 123000, tzinfo=timezone.utc),
+    datetime(2026, 10, 17, 9, 30, 15, 123000),     # Mongo 가 돌려주는 naive UTC
+])
+def test_comment_cursor_round_trip(created):
+    doc = {"_id": ObjectId(), "created_at": created}
+    assert main.decode_comment_cursor(main.encode_comment_cursor(doc)) == (
+        created.replace(tzinfo=timezone.utc), doc["_id"],
+    )
+
+
+def test_comments_range_uses_both_keys():
+    pid, doc = ObjectId(), {"_id": ObjectId(), "created_at": datetime(2026, 10, 17, tzinfo=timezone.utc)}
+    query = main.comments_range(pid, after=main.encode_comment_cursor(doc))
+    assert query == {"post_id": pid, "$and": [{"$or": [
+        {"created_at": {"$gt": doc["created_at"]}},
+        {"created_at": doc["created_at"], "_id": {"$gt": doc["_id"]}},
+    ]}]}
+
+
+@pytest.mark.parametrize("score", [1.0, 0.1 + 0.2, 11.5, 1e-7])
+def test_search_cursor_round_trip(score):
+    oid = ObjectId()
+    assert main.decode_search_cursor(main.encode_search_cursor(score, oid)) == (score, oid)   # float 정밀도 그대로
+
+
+@pytest.mark.parametrize("decode, token", [
+    (main.decode_cursor, "not-a-cursor"),
+    (main.decode_cursor, ""),
+    (main.decode_comment_cursor, "Zm9v"),                          # "foo"
+    (main.decode_comment_cursor, main.encode_cursor(ObjectId())),
+    (main.decode_search_cursor, "Zm9vOmJhcg"),                     # "foo:bar"
+    (main.decode_search_cursor, "!!!"),
+])
+def test_bad_cursor_is_400(decode, token):
+    with pytest.raises(HTTPException) as e:
+        decode(token)
+    assert e.value.status_code == 400
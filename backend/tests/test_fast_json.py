@@ -0,0 +1,30 @@
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app import main
+
+POST = {
+    "_id": ObjectId(), "title": "제목", "body": "본문 \"따옴표\" \n 줄바꿈", "excerpt": "본문",
+    "author_id": "a1", "author_username": "글쓴이", "comments_count": 2, "likes_count": 3, "ver": 1,
+}
+
+
+@pytest.fixture
+def client(fake_db):
+    fake_db.posts.find_one_result = dict(POST)
+    fake_db.posts.find_results = [dict(POST)]
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("url", [f"/posts/{POST['_id']}", "/posts", "/posts?fields=summary", "/posts/search?q=제목"])
+def test_fast_path_matches_pydantic_response(client, monkeypatch, url):
+    bodies = {}
+    for fast in (False, True):
+        monkeypatch.setattr(main, "FAST_JSON", fast)
+        main.post_cache.cache.clear()
+        r = client.get(url)
+        assert r.status_code == 200, r.text
+        assert r.headers["content-type"] == "application/json"
+        bodies[fast] = (r.json(), r.headers.get("etag"))
+    assert bodies[True] == bodies[False]
@@ -0,0 +1,53 @@
+import asyncio
+from time import perf_counter
+
+from fastapi import HTTPException
+
+from app import main
+
+
+def test_event_loop_stays_responsive_during_bcrypt():
+    hashed = main.hash_password("secret")
+    t0 = perf_counter()
+    main.verify_password("secret", hashed)
+    one_verify = perf_counter() - t0      # 머신 부하에 따라 달라지므로 기준도 같이 잰다
+    service = main.HashService("thread", workers=1, max_pending=64)   # 코어 1개 머신에서도 OS 스케줄링에 좌우되지 않게
+
+    async def ticker(stop: asyncio.Event) -> float:
+        worst = 0.0
+        while not stop.is_set():
+            t0 = perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, perf_counter() - t0 - 0.005)
+        return worst
+
+    async def scenario():
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(stop))
+        results = await asyncio.gather(*(service.verify("secret", hashed) for _ in range(4)))
+        stop.set()
+        return results, await tick
+
+    try:
+        results, worst_lag = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    assert all(results)
+    assert worst_lag < one_verify / 2     # bcrypt 한 번이라도 루프에서 돌았다면 그만큼 멈춤
+
+
+def test_full_queue_returns_503():
+    service = main.HashService("thread", workers=1, max_pending=1)
+    hashed = main.hash_password("secret")
+
+    async def scenario():
+        return await asyncio.gather(
+            service.verify("secret", hashed), service.verify("secret", hashed), return_exceptions=True,
+        )
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    assert first is True
+    assert isinstance(second, HTTPException) and second.status_code == 503
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from bson import ObjectId
+
+from app import main
+
+
+def make_feed(n: int) -> main.HotFeed:
+    feed = main.HotFeed()
+    now = time.time()
+    for i in range(n):
+        oid = ObjectId()
+        feed._stats[oid] = [i % 7, i % 3, now - i * 600]   # 10분 간격으로 작성된 글
+    feed._loaded = True
+    feed._rerank()
+    return feed
+
+
+def test_cursor_survives_rerank_later(monkeypatch):
+    feed = make_feed(50)
+    first, cursor = asyncio.run(feed.page(20, None))
+
+    later = time.time() + 60
+    monkeypatch.setattr(main.time, "time", lambda: later)    # 1분 뒤 재정렬
+    feed._rerank()
+    second, _ = asyncio.run(feed.page(20, cursor))
+
+    assert not set(first) & set(second)
+    assert first + second == feed._ids[:40]
+
+
+def test_score_prefers_newer_posts_with_equal_activity():
+    now = time.time()
+    assert main.HotFeed.score(5, 1, now) > main.HotFeed.score(5, 1, now - 3600)
+    assert main.HotFeed.score(50, 0, now - 3600) > main.HotFeed.score(0, 0, now)
@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app import main
+
+
+def failing_job(attempts: int) -> dict:
+    return {"_id": ObjectId(), "to": "a@example.com", "subject": "s", "body": "b", "attempts": attempts}
+
+
+def broken_deliver(monkeypatch):
+    async def deliver(job):
+        raise ConnectionError("smtp down")
+    monkeypatch.setattr(main.mailer, "deliver", deliver)
+
+
+def test_retry_schedules_backoff(fake_db, monkeypatch):
+    broken_deliver(monkeypatch)
+    asyncio.run(main.mailer.process(failing_job(1)))
+    _, update = fake_db.mail_outbox.updates[-1]
+    assert update["$set"]["status"] == "pending"
+    assert update["$set"]["due_at"] > datetime.now(timezone.utc)
+
+
+def test_dead_letter_outlives_code_ttl(fake_db, monkeypatch):
+    broken_deliver(monkeypatch)
+    asyncio.run(main.mailer.process(failing_job(main.MAIL_MAX_ATTEMPTS)))
+    _, update = fake_db.mail_outbox.updates[-1]
+    assert update["$set"]["status"] == "dead"
+    assert update["$unset"] == {"body": ""}
+    assert update["$set"]["expires_at"] > datetime.now(timezone.utc) + timedelta(days=1)
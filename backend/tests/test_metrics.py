@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def cache_rows(samples: list) -> dict:
+    return {
+        (family, labels.get("cache")): value
+        for family, _, labels, value in samples
+        if family.startswith(("cache_", "post_cache_"))
+    }
+
+
+def test_cache_stats_are_exported(fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t"}
+    before = cache_rows(main.metrics.samples())
+
+    async def reads():
+        await main.post_cache.get(oid)          # miss → 조회
+        await main.post_cache.get(oid)          # hit
+
+    asyncio.run(reads())
+    main.principal_cache.get("nobody")
+    rows = cache_rows(main.metrics.samples())
+
+    assert rows[("cache_hits_total", "post")] == before[("cache_hits_total", "post")] + 1
+    assert rows[("cache_misses_total", "post")] == before[("cache_misses_total", "post")] + 1
+    assert rows[("post_cache_queries_total", None)] == before[("post_cache_queries_total", None)] + 1
+    assert rows[("cache_misses_total", "principal")] == before[("cache_misses_total", "principal")] + 1
+    assert ("cache_entries", "token") in rows
+    assert "# TYPE cache_hits_total counter" in main.render_metrics([(main.WORKER_ID, main.metrics.samples())])
+
+
+def test_background_task_does_not_inherit_request_context():
+    async def scenario():
+        token = main.mongo_calls.set({})           # 요청 처리 중인 것처럼
+        try:
+            seen = await main.start_background(read_calls())
+        finally:
+            main.mongo_calls.reset(token)
+        return seen
+
+    async def read_calls():
+        return main.mongo_calls.get()
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_sse_stream_is_not_counted_as_in_flight_or_latency():
+    in_flight_during = []
+
+    async def sse_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        in_flight_during.append(main.metrics.in_flight)
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n"})
+
+    async def send(message):
+        pass
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "GET", "path": "/sse-test", "headers": []}
+    before = main.metrics.in_flight
+    latency_before = list(main.metrics.latency.get(("GET", "unmatched"), []))
+    requests_before = main.metrics.requests.get(("GET", "unmatched", 200), 0)
+
+    asyncio.run(main.MetricsMiddleware(sse_app)(scope, receive, send))
+
+    assert in_flight_during == [before]
+    assert main.metrics.in_flight == before
+    assert main.metrics.latency.get(("GET", "unmatched"), []) == latency_before
+    assert main.metrics.requests[("GET", "unmatched", 200)] == requests_before + 1
+
+
+def test_mongo_listener_records_per_request_and_background():
+    listener = main.MongoCommandMetrics()
+    event = SimpleNamespace(command_name="find", duration_micros=250)
+
+    calls: list = []
+    token = main.mongo_calls.set(calls)
+    try:
+        listener.succeeded(event)
+        listener.failed(event)
+    finally:
+        main.mongo_calls.reset(token)
+    assert calls == [("find", 250, 0), ("find", 250, 1)]
+
+    listener.succeeded(SimpleNamespace(command_name="bench_bg", duration_micros=100))
+    rows = {(s[2].get("route"), s[2].get("command")): s[3] for s in main.metrics.samples()
+            if s[0] == "mongo_commands_total"}
+    assert rows[("background", "bench_bg")] >= 1
+    assert not main.metrics.background_mongo
+
+
+def test_metrics_endpoint_is_gated(fake_db, monkeypatch):
+    client = TestClient(main.app)                      # 클라이언트 주소 "testclient" → 내부 아님
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 404
+    r = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200
+    assert "# TYPE http_requests_total counter" in r.text
+
+
+def test_metrics_endpoint_allows_private_address(fake_db):
+    client = TestClient(main.app, client=("10.0.0.5", 5000))
+    assert client.get("/metrics").status_code == 200
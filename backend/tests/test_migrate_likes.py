@@ -0,0 +1,29 @@
+import asyncio
+
+from bson import ObjectId
+
+from app import main
+
+
+def test_full_scan_records_completion(fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_results = [{"_id": oid, "likes": ["u1", "u2"]}]
+
+    asyncio.run(main.migrate_embedded_likes())
+
+    assert ("post_likes", "bulk_write") in fake_db.calls
+    _, post_update = fake_db.posts.updates[-1]
+    assert post_update["$inc"] == {"ver": 1}      # 캐시된 ETag 무효화
+    flt, update = fake_db.counters.updates[-1]
+    assert flt == {"_id": main.MIGRATE_LIKES_MARKER}
+    assert update["$set"]["done"] is True
+    assert update["$set"]["moved"] == 1
+
+
+def test_skips_scan_once_marked_done(fake_db):
+    fake_db.counters.find_one_result = {"_id": main.MIGRATE_LIKES_MARKER, "done": True}
+    fake_db.posts.find_results = [{"_id": ObjectId(), "likes": ["u1"]}]
+
+    asyncio.run(main.migrate_embedded_likes())
+
+    assert fake_db.calls == [("counters", "find_one")]
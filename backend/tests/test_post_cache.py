@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app import main
+
+
+class GatedPosts:
+    """find_one 이 release 될 때까지 멈춰 있는 posts 대역."""
+    name = "posts"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def find_one(self, flt, *args, **kwargs):
+        self.calls += 1
+        ver = self.calls
+        await self.release.wait()
+        return {"_id": flt["_id"], "title": "t", "ver": ver}
+
+
+@pytest.fixture
+def cache():
+    return main.PostCache(100, 60)
+
+
+def test_concurrent_misses_share_one_query(cache, monkeypatch):
+    oid = ObjectId()
+
+    async def scenario():
+        posts = GatedPosts()
+        monkeypatch.setattr(main, "posts", posts)
+        readers = [asyncio.create_task(cache.get(oid)) for _ in range(5)]
+        await asyncio.sleep(0)
+        posts.release.set()
+        docs = await asyncio.gather(*readers)
+        return posts.calls, docs
+
+    calls, docs = asyncio.run(scenario())
+    assert calls == 1
+    assert all(d["_id"] == oid for d in docs)
+    assert cache.queries == 1 and cache.coalesced == 4
+    assert cache.cache.get(oid) is not None
+
+
+def test_leader_cancellation_does_not_fail_followers(cache, monkeypatch):
+    oid = ObjectId()
+
+    async def scenario():
+        posts = GatedPosts()
+        monkeypatch.setattr(main, "posts", posts)
+        leader = asyncio.create_task(cache.get(oid))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get(oid))
+        await asyncio.sleep(0)
+        leader.cancel()                  # 클라이언트 연결 끊김
+        await asyncio.sleep(0)
+        posts.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, posts.calls
+
+    doc, calls = asyncio.run(scenario())
+    assert doc["_id"] == oid
+    assert calls == 1
+
+
+def test_invalidate_during_lookup_skips_caching(cache, monkeypatch):
+    oid = ObjectId()
+
+    async def scenario():
+        posts = GatedPosts()
+        monkeypatch.setattr(main, "posts", posts)
+        first = asyncio.create_task(cache.get(oid))
+        await asyncio.sleep(0)
+        cache.invalidate(oid)            # 조회 도중 글이 수정됨
+        second = asyncio.create_task(cache.get(oid))
+        await asyncio.sleep(0)
+        posts.release.set()
+        return await first, await second, posts.calls
+
+    stale, fresh, calls = asyncio.run(scenario())
+    assert calls == 2                    # invalidate 뒤 요청은 진행 중 조회에 합류하지 않음
+    assert stale["ver"] == 1 and fresh["ver"] == 2
+    assert cache.cache.get(oid)["ver"] == 2
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app import main
+
+USER = {"_id": ObjectId(), "username": "fan"}
+
+
+@pytest.fixture
+def client(fake_db):
+    main.app.dependency_overrides[main.get_current_user] = lambda: USER
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def test_like_emits_event(client, fake_db):
+    oid = ObjectId()
+    sub = main.event_hub.subscribe(oid)
+    try:
+        assert client.post(f"/posts/{oid}/likes").status_code == 204
+        assert sub.queue.get_nowait().startswith("event: likes\n")
+    finally:
+        main.event_hub.unsubscribe(oid, sub)
+
+
+def test_like_on_missing_post_emits_nothing(client, fake_db):
+    oid = ObjectId()
+    fake_db.posts.matched = 0              # $inc 가 맞춘 글 없음 + post_cache 조회도 None
+    sub = main.event_hub.subscribe(oid)
+    try:
+        assert client.post(f"/posts/{oid}/likes").status_code == 404
+        assert sub.queue.empty()
+        assert ("post_likes", "delete_one") in fake_db.calls
+    finally:
+        main.event_hub.unsubscribe(oid, sub)
+
+
+def test_like_already_in_legacy_array_emits_nothing(client, fake_db, monkeypatch):
+    oid = ObjectId()
+    fake_db.posts.matched = 0              # likes: {$ne: uid} 에 걸려 $inc 안 됨
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t", "likes": [str(USER["_id"])]}
+    bumps = []
+    monkeypatch.setattr(main.hot_feed, "bump", lambda *a, **kw: bumps.append((a, kw)))
+    sub = main.event_hub.subscribe(oid)
+    try:
+        assert client.post(f"/posts/{oid}/likes").status_code == 204
+        assert sub.queue.empty()
+        assert bumps == []
+        assert ("post_likes", "delete_one") not in fake_db.calls
+    finally:
+        main.event_hub.unsubscribe(oid, sub)
+
+
+def test_slow_subscriber_is_dropped():
+    oid = ObjectId()
+    sub = main.event_hub.subscribe(oid)
+    for _ in range(main.SSE_QUEUE_SIZE + 1):
+        main.event_hub.publish(oid, "likes", {"delta": 1})
+    assert sub.dropped
+    assert oid not in main.event_hub._subs
+
+
+def test_delete_post_closes_subscribers(client, fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid}
+    sub = main.event_hub.subscribe(oid)
+    before = main.event_hub.count
+    assert client.delete(f"/posts/{oid}").status_code == 204
+    assert sub.closed
+    assert sub.queue.get_nowait().startswith("event: post_deleted\n")
+    assert oid not in main.event_hub._subs
+    assert main.event_hub.count == before - 1
+
+
+def test_stream_ends_after_post_deleted(fake_db):
+    oid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": oid, "title": "t"}
+
+    async def scenario():
+        resp = await main.post_events(str(oid))
+        stream = resp.body_iterator
+        out = [await anext(stream)]
+        main.event_hub.publish(oid, "likes", {"delta": 1})
+        main.event_hub.publish(oid, "post_deleted", {})
+        out += [msg async for msg in stream]     # 닫히기 전 이벤트까지 보내고 스스로 끝나야 함
+        return out
+
+    out = asyncio.run(scenario())
+    assert out[0] == "retry: 3000\n\n"
+    assert [m.split("\n")[0] for m in out[1:]] == ["event: likes", "event: post_deleted"]
+    assert oid not in main.event_hub._subs
+
+
+def test_deleted_post_hides_comments_and_events(client, fake_db):
+    oid = ObjectId()                       # post_cache 조회가 None(삭제 표시 또는 없음)
+    assert client.get(f"/posts/{oid}/comments").status_code == 404
+    assert client.get(f"/posts/{oid}/comments?stream=1").status_code == 404
+    assert client.get(f"/posts/{oid}/events").status_code == 404
+    assert ("comments", "find") not in fake_db.calls
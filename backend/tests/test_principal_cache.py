@@ -0,0 +1,87 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+from starlette.responses import Response
+
+from app import main
+
+UID = ObjectId()
+
+
+def principal(username: str, token_version: int = 0) -> dict:
+    return {"_id": UID, "email": "a@example.com", "username": username,
+            "token_version": token_version, "email_verified": True}
+
+
+@pytest.fixture
+def caches(fake_db, monkeypatch):
+    main.token_cache.clear()
+    main.principal_cache.clear()
+    started = []
+    monkeypatch.setattr(main, "start_background", lambda coro: started.append(coro) or coro.close())
+    yield started
+    main.token_cache.clear()
+    main.principal_cache.clear()
+
+
+def lookups(fake_db) -> int:
+    return fake_db.calls.count(("users", "find_one"))
+
+
+def test_repeat_requests_hit_cache(caches, fake_db):
+    token = main.create_access_token({"sub": str(UID)})
+    fake_db.users.find_one_result = principal("kim")
+    first = asyncio.run(main.get_current_user(token))
+    again = asyncio.run(main.get_current_user(token))
+    assert first["username"] == again["username"] == "kim"
+    assert lookups(fake_db) == 1
+    assert main.token_cache.get(token) == str(UID)
+
+
+def test_token_cache_never_outlives_token(caches, fake_db):
+    token = main.create_access_token({"sub": str(UID)}, expires_delta=timedelta(seconds=2))
+    fake_db.users.find_one_result = principal("kim")
+    asyncio.run(main.get_current_user(token))
+    expires_at, _ = main.token_cache._data[token]
+    assert expires_at - time.monotonic() <= 2
+
+
+def test_update_me_invalidates_principal(caches, fake_db):
+    token = main.create_access_token({"sub": str(UID)})
+    fake_db.users.find_one_result = principal("kim")
+    current = asyncio.run(main.get_current_user(token))
+
+    fake_db.users.find_one_result = principal("lee")   # find_one_and_update(AFTER) 와 다음 조회 결과
+    out = asyncio.run(main.update_me(main.UserUpdate(username="lee"), current))
+    assert out.username == "lee"
+    assert main.principal_cache.get(str(UID)) is None
+    assert [c.__name__ for c in caches] == ["sync_author_username"]
+
+    assert asyncio.run(main.get_current_user(token))["username"] == "lee"
+    assert lookups(fake_db) == 2
+
+
+def test_update_me_same_name_keeps_cache(caches, fake_db):
+    token = main.create_access_token({"sub": str(UID)})
+    fake_db.users.find_one_result = principal("kim")
+    current = asyncio.run(main.get_current_user(token))
+    asyncio.run(main.update_me(main.UserUpdate(username="kim"), current))
+    assert main.principal_cache.get(str(UID)) is not None
+    assert caches == []
+    assert ("users", "find_one_and_update") not in fake_db.calls
+
+
+def test_logout_invalidates_principal(caches, fake_db):
+    token = main.create_access_token({"sub": str(UID)})
+    fake_db.users.find_one_result = principal("kim")
+    current = asyncio.run(main.get_current_user(token))
+
+    asyncio.run(main.logout(Response(), current))
+    assert fake_db.users.updates == [({"_id": UID}, {"$inc": {"token_version": 1}})]
+    assert main.principal_cache.get(str(UID)) is None
+
+    fake_db.users.find_one_result = principal("kim", token_version=1)
+    assert asyncio.run(main.get_current_user(token))["token_version"] == 1   # 다음 요청은 새 token_version 을 봄
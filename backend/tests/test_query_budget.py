@@ -0,0 +1,100 @@
+"""
+쓰기 엔드포인트별 Mongo 명령 예산.
+fake_db 가 (컬렉션, 메서드) 호출을 순서대로 기록하므로, 핸들러가 왕복을 늘리면 여기서 걸린다.
+"""
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from pymongo.errors import DuplicateKeyError
+
+from app import main
+
+USER = {"_id": ObjectId(), "username": "writer", "email": "writer@example.com"}
+
+
+@pytest.fixture
+def client(fake_db):
+    main.app.dependency_overrides[main.get_current_user] = lambda: USER
+    yield TestClient(main.app)          # with 없이 → startup 훅(인덱스 생성 등) 안 돎
+    main.app.dependency_overrides.clear()
+
+
+def test_create_post(client, fake_db):
+    r = client.post("/posts", json={"title": "t", "body": "b"})
+    assert r.status_code == 201
+    assert fake_db.calls == [("posts", "insert_one"), ("counters", "update_one")]
+
+
+def test_update_post(client, fake_db):
+    pid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": pid, "title": "t2", "body": "b2", "author_id": str(USER["_id"])}
+    r = client.put(f"/posts/{pid}", json={"title": "t2", "body": "b2"})
+    assert r.status_code == 200
+    assert fake_db.calls == [("posts", "find_one_and_update")]
+
+
+def test_delete_post(client, fake_db):
+    pid = ObjectId()
+    fake_db.posts.find_one_result = {"_id": pid}
+    r = client.delete(f"/posts/{pid}")
+    assert r.status_code == 204
+    assert fake_db.calls == [
+        ("posts", "find_one_and_update"), ("counters", "update_one"), ("purge_jobs", "update_one"),
+    ]
+
+
+def test_create_comment(client, fake_db):
+    r = client.post(f"/posts/{ObjectId()}/comments", json={"body": "hi"})
+    assert r.status_code == 201
+    assert fake_db.calls == [("comments", "insert_one"), ("posts", "update_one")]
+
+
+def test_create_comment_on_missing_post_rolls_back(client, fake_db):
+    fake_db.posts.matched = 0
+    r = client.post(f"/posts/{ObjectId()}/comments", json={"body": "hi"})
+    assert r.status_code == 404
+    assert fake_db.calls == [("comments", "insert_one"), ("posts", "update_one"), ("comments", "delete_one")]
+
+
+def test_delete_comment(client, fake_db):
+    cid = ObjectId()
+    fake_db.comments.find_one_result = {"_id": cid}
+    r = client.delete(f"/posts/{ObjectId()}/comments/{cid}")
+    assert r.status_code == 204
+    assert fake_db.calls == [("comments", "find_one_and_delete"), ("posts", "update_one")]
+
+
+def test_like(client, fake_db):
+    r = client.post(f"/posts/{ObjectId()}/likes")
+    assert r.status_code == 204
+    assert fake_db.calls == [("post_likes", "update_one"), ("posts", "update_one")]
+
+
+def test_unlike(client, fake_db):
+    r = client.delete(f"/posts/{ObjectId()}/likes")
+    assert r.status_code == 204
+    assert fake_db.calls == [("post_likes", "delete_one"), ("posts", "update_one")]
+
+
+def test_signup(client, fake_db):
+    r = client.post("/auth/signup", json={"email": "new@example.com", "username": "new", "password": "pw"})
+    assert r.status_code == 201
+    assert fake_db.calls == [
+        ("users", "find"),
+        ("users", "insert_one"), ("veri_tokens", "insert_one"),     # 사용자 저장이 성공한 뒤에 토큰
+        ("mail_outbox", "insert_one"),
+    ]
+
+
+@pytest.mark.parametrize("key_pattern, field", [({"email": 1}, "email"), ({"username": 1}, "username")])
+def test_signup_race_reports_field_from_key_pattern(client, fake_db, monkeypatch, key_pattern, field):
+    async def insert_one(doc, session=None):
+        fake_db.calls.append(("users", "insert_one"))
+        raise DuplicateKeyError("E11000 duplicate key", 11000, {"keyPattern": key_pattern})
+
+    monkeypatch.setattr(fake_db.users, "insert_one", insert_one)
+    # 이메일에 "username" 이 들어 있어도 메시지 검색이 아니라 keyPattern 으로 판단
+    r = client.post("/auth/signup", json={"email": "username@example.com", "username": "u", "password": "pw"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == f"{field} already in use"
+    assert ("veri_tokens", "insert_one") not in fake_db.calls      # 고아 토큰 없음
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from app import main
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        main.RateLimiter()
+
+
+def test_memory_limiter_rejects_over_limit():
+    limiter = main.MemoryRateLimiter(max_keys=10)
+
+    async def scenario():
+        return [await limiter.hit("k", 3, 60) for _ in range(5)]
+
+    assert asyncio.run(scenario()) == [True, True, True, False, False]
+
+
+def test_memory_limiter_caps_keys():
+    limiter = main.MemoryRateLimiter(max_keys=100)
+
+    async def scenario():
+        for i in range(1000):
+            await limiter.hit(f"k{i}", 3, 60)
+
+    asyncio.run(scenario())
+    assert len(limiter._buckets) == 100
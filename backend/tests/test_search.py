@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from starlette.responses import Response
+
+from app import main
+from tests.conftest import FakeCursor
+
+
+@pytest.fixture
+def pipelines(fake_db, monkeypatch):
+    seen = []
+
+    def aggregate(pipeline):
+        seen.append(pipeline)
+        return FakeCursor(fake_db.posts.find_results)
+
+    monkeypatch.setattr(fake_db.posts, "aggregate", aggregate)
+    monkeypatch.setattr(main, "FAST_JSON", False)
+    return seen
+
+
+def search(q: str, limit: int = 20, cursor=None) -> tuple:
+    response = Response()
+    out = asyncio.run(main.search_posts(response, q=q, limit=limit, cursor=cursor))
+    return out, response
+
+
+def test_text_search_pipeline(pipelines, monkeypatch):
+    monkeypatch.setattr(main, "SEARCH_NGRAM", False)
+    search("게시판 검색", limit=5)
+    (pipeline,) = pipelines
+    assert pipeline[0] == {"$match": {"$text": {"$search": "게시판 검색"}, **main.NOT_DELETED}}
+    assert pipeline[1] == {"$addFields": {"score": {"$meta": "textScore"}}}
+    assert pipeline[2:] == [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": 6},
+        {"$project": {**main.POST_SUMMARY_PROJECTION, "score": 1}},
+    ]
+
+
+def test_ngram_search_pipeline(pipelines, monkeypatch):
+    monkeypatch.setattr(main, "SEARCH_NGRAM", True)
+    search("게시판에서 a")
+    (pipeline,) = pipelines
+    grams = sorted(["게시", "시판", "판에", "에서"])   # 1글자 gram("a") 은 긴 gram 이 있으면 뺌
+    assert pipeline[0] == {"$match": {"search_grams": {"$all": grams}, **main.NOT_DELETED}}
+    title_ratio = pipeline[1]["$addFields"]["score"]["$add"][1]["$multiply"]
+    assert title_ratio[0] == main.SEARCH_TITLE_WEIGHT
+    assert title_ratio[1]["$divide"][1] == len(grams)
+
+
+def test_ngram_single_char_query(pipelines, monkeypatch):
+    monkeypatch.setattr(main, "SEARCH_NGRAM", True)
+    search("글")
+    assert pipelines[0][0]["$match"]["search_grams"] == {"$all": ["글"]}
+
+
+def test_ngram_query_without_words_skips_db(pipelines, monkeypatch):
+    monkeypatch.setattr(main, "SEARCH_NGRAM", True)
+    out, _ = search("?!")
+    assert out == [] and pipelines == []
+
+
+def test_cursor_adds_keyset_match_and_next_cursor(pipelines, fake_db, monkeypatch):
+    monkeypatch.setattr(main, "SEARCH_NGRAM", False)
+    last = ObjectId()
+    fake_db.posts.find_results = [
+        {"_id": ObjectId(), "title": f"t{i}", "author_id": "a", "author_username": "u", "score": 3.0 - i}
+        for i in range(3)
+    ]
+    _, response = search("q", limit=2, cursor=main.encode_search_cursor(4.5, last))
+    keyset = pipelines[0][2]
+    assert keyset == {"$match": {"$or": [
+        {"score": {"$lt": 4.5}},
+        {"score": 4.5, "_id": {"$lt": last}},
+    ]}}
+    page_end = fake_db.posts.find_results[1]
+    assert main.decode_search_cursor(response.headers["X-Next-Cursor"]) == (page_end["score"], page_end["_id"])
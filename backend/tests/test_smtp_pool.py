@@ -0,0 +1,94 @@
+"""
+SmtpPool 을 로컬 aiosmtpd 서버에 붙여 연결 재사용/재연결 확인 (aiosmtpd, aiosmtplib 없으면 건너뜀).
+"""
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+from app import main
+
+pytest.importorskip("aiosmtplib")
+controller_mod = pytest.importorskip("aiosmtpd.controller")
+
+
+class Recorder:
+    def __init__(self):
+        self.messages: list = []
+        self.peers: set = set()          # 접속마다 클라이언트 (host, port) 가 다름
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        self.peers.add(session.peer)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    port = free_port()
+    monkeypatch.setattr(main, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(main, "SMTP_PORT", port)
+    monkeypatch.setattr(main, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(main, "SMTP_USER", "")
+    recorder = Recorder()
+    servers = []
+
+    def start():
+        c = controller_mod.Controller(recorder, hostname="127.0.0.1", port=port)
+        c.start()
+        servers.append(c)
+        return c
+
+    start()
+    yield recorder, start, servers
+    for c in servers:
+        try:
+            c.stop()
+        except Exception:
+            pass
+
+
+def message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "no-reply@localhost"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = f"test {i}"
+    msg.set_content("본문")
+    return msg
+
+
+def test_connection_is_reused(smtp):
+    recorder, _, _ = smtp
+    pool = main.SmtpPool(1)
+
+    async def scenario():
+        for i in range(3):
+            await pool.send(message(i))
+        await pool.close()
+
+    asyncio.run(scenario())
+    assert len(recorder.messages) == 3
+    assert len(recorder.peers) == 1
+
+
+def test_reconnects_after_server_drops_connection(smtp):
+    recorder, start, servers = smtp
+    pool = main.SmtpPool(1)
+
+    async def scenario():
+        await pool.send(message(0))
+        servers[-1].stop()               # 쉬는 동안 서버가 연결을 끊음
+        start()
+        await pool.send(message(1))      # 끊긴 연결 → 새로 접속해 한 번 더
+        await pool.close()
+
+    asyncio.run(scenario())
+    assert len(recorder.messages) == 2
+    assert len(recorder.peers) == 2
@@ -0,0 +1,44 @@
+import asyncio
+from time import perf_counter
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app import main
+
+FLOOR = main.AUTH_FLOOR_MS / 1000
+
+
+def test_floor_applies_when_block_raises():
+    async def failing():
+        async with main.timing_floor():
+            raise HTTPException(401)
+
+    t0 = perf_counter()
+    with pytest.raises(HTTPException):
+        asyncio.run(failing())
+    assert perf_counter() - t0 >= FLOOR
+
+
+def test_concurrent_failed_logins_take_one_floor_period(fake_db, monkeypatch):
+    async def verify_with_dummy(plain, hashed):
+        await asyncio.sleep(0.01)
+        return False
+
+    monkeypatch.setattr(main.hasher, "verify_with_dummy", verify_with_dummy)
+
+    async def one(i: int) -> float:
+        t0 = perf_counter()
+        with pytest.raises(HTTPException) as exc:
+            await main.login(main.LoginBody(email=f"nobody{i}@example.com", password="wrong"), Response())
+        assert exc.value.status_code == 401
+        return perf_counter() - t0
+
+    async def scenario():
+        t0 = perf_counter()
+        each = await asyncio.gather(*(one(i) for i in range(100)))
+        return perf_counter() - t0, each
+
+    total, each = asyncio.run(scenario())
+    assert min(each) >= FLOOR                 # 모든 실패 응답이 바닥 시간을 채움
+    assert total < FLOOR * 1.5                # 대기가 루프를 막지 않아 100건이 한 주기 안에 끝남
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app import main
+
+UID = ObjectId()
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return [{"_id": d["_id"]} for d in self.docs]
+
+
+class AuthoredDocs:
+    """author_id/author_username 필터와 update_many($set/$inc) 만 흉내 내는 메모리 컬렉션."""
+    def __init__(self):
+        self.docs: list = []
+
+    def add(self, username: str) -> dict:
+        doc = {"_id": ObjectId(), "author_id": str(UID), "author_username": username, "ver": 0}
+        self.docs.append(doc)
+        return doc
+
+    def find(self, flt, projection=None):
+        return FakeCursor([
+            d for d in self.docs
+            if d["author_id"] == flt["author_id"] and d["author_username"] != flt["author_username"]["$ne"]
+        ])
+
+    async def update_many(self, flt, update, session=None):
+        for d in self.docs:
+            if d["_id"] in flt["_id"]["$in"]:
+                d.update(update["$set"])
+                d["ver"] += update["$inc"]["ver"]
+
+
+@pytest.fixture
+def authored(fake_db, monkeypatch):
+    posts, comments = AuthoredDocs(), AuthoredDocs()
+    monkeypatch.setattr(main, "posts", posts)
+    monkeypatch.setattr(main, "comments", comments)
+    monkeypatch.setattr(main, "USER_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(main, "USERNAME_SYNC_SLACK_SECONDS", 0)
+    monkeypatch.setattr(main, "PURGE_BATCH_PAUSE_SECONDS", 0)
+    fake_db.users.find_one_result = {"_id": UID, "username": "new"}
+    return posts, comments
+
+
+def test_second_pass_fixes_writes_from_stale_principal_cache(authored, fake_db, monkeypatch):
+    posts, comments = authored
+    old_post, old_comment = posts.add("old"), comments.add("old")
+    late = []
+    first_pass = main.sync_username_pass
+
+    async def pass_then_stale_write(uid):
+        name = await first_pass(uid)
+        if not late:        # 첫 패스 직후 다른 워커가 캐시된 옛 이름으로 글/댓글을 씀
+            late.extend((posts.add("old"), comments.add("old")))
+        return name
+
+    monkeypatch.setattr(main, "sync_username_pass", pass_then_stale_write)
+    asyncio.run(main.sync_author_username(UID))
+    assert [d["author_username"] for d in (old_post, old_comment, *late)] == ["new"] * 4
+    assert old_post["ver"] == 1 and late[0]["ver"] == 1
+    # pending 표시는 두 번째 패스가 끝난 뒤에만 지움
+    assert fake_db.users.updates == [({"_id": UID, "username": "new"}, {"$unset": {"username_sync_pending": ""}})]
+
+
+def test_missing_user_leaves_docs_alone(authored, fake_db):
+    posts, _ = authored
+    doc = posts.add("old")
+    fake_db.users.find_one_result = None
+    asyncio.run(main.sync_author_username(UID))
+    assert doc["author_username"] == "old"
+    assert fake_db.users.updates == []